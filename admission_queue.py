@@ -0,0 +1,131 @@
+import asyncio
+import collections
+import logging
+import time
+
+log = logging.getLogger("bot.admission")
+
+class QueueFull(Exception):
+    """Raised when a guild's ticket queue already holds the maximum number of users."""
+
+class AdmissionTurn:
+    """A user's place in the ticket queue of a guild.
+
+    Used as `async with queue.enqueue(guild_id) as turn:` - `await turn.wait()` returns
+    once it is the user's turn, and the guild's slot is given to the next user when the
+    block is left (or earlier with release()).
+    """
+
+    def __init__(self, queue, guild_id):
+        self._queue = queue
+        self.guild_id = guild_id
+        self._granted = asyncio.get_running_loop().create_future()
+
+    @property
+    def position(self):
+        """How many creations are ahead of this one (0 = it is running or about to)."""
+        return self._queue.position(self)
+
+    async def wait(self):
+        """Waits for this turn (raises asyncio.TimeoutError after the queue's max_wait)."""
+        await asyncio.wait_for(asyncio.shield(self._granted), timeout=self._queue.max_wait)
+
+    def release(self):
+        """Gives up the place or the slot (safe to call more than once)."""
+        self._queue._leave(self)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.release()
+
+    def _grant(self):
+        if not self._granted.done():
+            self._granted.set_result(None)
+
+class AdmissionQueue:
+    """Admits ticket channel creations one at a time per guild, in click order.
+
+    Creating a channel goes through the per-guild channel create rate limit bucket of
+    Discord, so running a burst of clicks concurrently only produces 429s. Each guild
+    gets a FIFO queue (one place per user, see claim_ticket_creation), the next creation
+    starts when the previous one finished and - if the bucket is exhausted - once its
+    reset time has passed. Queues are bounded so a raid gets a clear "try again later"
+    instead of interactions that time out.
+    """
+
+    def __init__(self, max_length, max_wait):
+        self.max_length = max_length
+        self.max_wait = max_wait
+        # guild ID -> deque of AdmissionTurn waiting for the slot
+        self._waiting = {}
+        # guild ID -> AdmissionTurn holding the slot
+        self._active = {}
+        # guild ID -> time.monotonic() before which no new creation may start
+        self._resume_at = {}
+        self._grant_handles = {}
+        # Turns waiting in all guilds - kept as a counter because the metrics gauge reads it from the Flask thread
+        self._length = 0
+
+    def __len__(self):
+        return self._length
+
+    def enqueue(self, guild_id):
+        """Queues a ticket creation and returns its AdmissionTurn (raises QueueFull)."""
+        waiting = self._waiting.setdefault(guild_id, collections.deque())
+        if len(waiting) >= self.max_length:
+            raise QueueFull()
+        turn = AdmissionTurn(self, guild_id)
+        waiting.append(turn)
+        self._length += 1
+        self._advance(guild_id)
+        return turn
+
+    def position(self, turn):
+        waiting = self._waiting.get(turn.guild_id, ())
+        if turn not in waiting:
+            return 0
+        active = 1 if turn.guild_id in self._active else 0
+        return list(waiting).index(turn) + active
+
+    def pause(self, guild_id, seconds):
+        """Holds back new creations in a guild for `seconds` (its rate limit bucket is empty)."""
+        resume_at = time.monotonic() + seconds
+        if resume_at > self._resume_at.get(guild_id, 0):
+            self._resume_at[guild_id] = resume_at
+            log.debug("Channel create bucket of guild %s exhausted, pausing %.2fs", guild_id, seconds)
+
+    def _leave(self, turn):
+        guild_id = turn.guild_id
+        if self._active.get(guild_id) is turn:
+            del self._active[guild_id]
+        else:
+            waiting = self._waiting.get(guild_id)
+            if waiting and turn in waiting:
+                waiting.remove(turn)
+                self._length -= 1
+        self._advance(guild_id)
+
+    def _advance(self, guild_id):
+        """Hands the slot of a guild to the next waiting turn, respecting the bucket's reset time."""
+        if guild_id in self._active or guild_id in self._grant_handles:
+            return
+        waiting = self._waiting.get(guild_id)
+        if not waiting:
+            self._waiting.pop(guild_id, None)
+            return
+        delay = self._resume_at.get(guild_id, 0) - time.monotonic()
+        if delay > 0:
+            self._grant_handles[guild_id] = asyncio.get_running_loop().call_later(delay, self._grant_next, guild_id)
+            return
+        self._resume_at.pop(guild_id, None)
+        turn = waiting.popleft()
+        self._length -= 1
+        self._active[guild_id] = turn
+        turn._grant()
+
+    def _grant_next(self, guild_id):
+        # The bucket's reset time has passed (or was pushed back by another pause - _advance checks again)
+        self._grant_handles.pop(guild_id, None)
+        self._advance(guild_id)
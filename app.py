@@ -1,581 +1,142 @@
+# Imported first so the startup report includes the time spent importing everything else
+from startup_timing import startup_timer
+
 import discord
 import os
-from dotenv import load_dotenv
-import asyncio
-from threading import Thread
-from flask import Flask
 import sys
-import importlib
-
-# Load environment variables from .env file
-load_dotenv()
-
-# Define Discord Intents
-intents = discord.Intents.default()
-intents.message_content = True
-intents.members = True
-
-client = discord.Client(intents=intents)
-
-# --- Ticket Channel Management ---
-
-# Configuration for support roles (add these role names to your server)
-SUPPORT_ROLES = {
-    'general': ['Team', 'Supporter', 'Mod'],  # Multiple roles for general support
-    'report': 'Admin',                        # Only Admins for user reports (Mod removed)
-    'unban': 'Admin'                          # Only Admins for unban requests
-}
-
-# High-level roles that always have access to all tickets
-ADMIN_ROLES = ['OWNER', 'Admin']  # These roles always have access to all tickets
-
-# Category ID where ticket channels will be created (set this to your ticket category ID)
-TICKET_CATEGORY_ID = None  # Replace with your category ID (int) or leave None for no category
-
-async def has_existing_ticket(guild, user, ticket_type):
-    """Checks if user already has an open ticket of this type."""
-    # Check for any ticket channel that contains the user's name and ticket type
-    user_name_lower = user.name.lower().replace(" ", "-")
-    
-    for channel in guild.text_channels:
-        channel_name_lower = channel.name.lower()
-        
-        # Check if this is a ticket channel for this user and type
-        if (f"ticket-{ticket_type}" in channel_name_lower and 
-            user_name_lower in channel_name_lower):
-            return channel
-            
-        # Also check for any ticket channel with this user's name (more flexible)
-        if (channel_name_lower.startswith("ticket-") and 
-            user_name_lower in channel_name_lower and
-            ticket_type.split("-")[0] in channel_name_lower):
-            return channel
-    
-    return None
-
-async def has_any_existing_ticket(guild, user):
-    """Checks if user already has any open ticket."""
-    user_name_lower = user.name.lower().replace(" ", "-")
-    user_id = str(user.id)
-    
-    print(f"Checking tickets for user: {user.name} (ID: {user_id})")  # Debug
-    
-    for channel in guild.text_channels:
-        channel_name_lower = channel.name.lower()
-        
-        print(f"Checking channel: {channel_name_lower}")  # Debug
-        
-        # Check multiple patterns for ticket channels
-        if channel_name_lower.startswith("ticket-"):
-            # Pattern 1: ticket-type-username
-            if user_name_lower in channel_name_lower:
-                print(f"Found existing ticket by username: {channel.name}")  # Debug
-                return channel
-            
-            # Pattern 2: ticket-type-userid
-            if user_id in channel_name_lower:
-                print(f"Found existing ticket by user ID: {channel.name}")  # Debug
-                return channel
-            
-            # Pattern 3: Check channel permissions (most reliable)
-            # If user has specific permissions in a ticket channel, it's likely their ticket
-            overwrites = channel.overwrites_for(user)
-            if overwrites.read_messages is True and overwrites.send_messages is not None:
-                # Check if this looks like a ticket channel for this user
-                if any(word in channel_name_lower for word in ["ticket", "support", "report", "unban"]):
-                    print(f"Found existing ticket by permissions: {channel.name}")  # Debug
-                    return channel
-    
-    print("No existing tickets found")  # Debug
-    return None
-
-async def create_ticket_channel(guild, user, ticket_type, support_role_names):
-    """Creates a private ticket channel for the user."""
-    
-    # Set channel permissions
-    overwrites = {
-        guild.default_role: discord.PermissionOverwrite(read_messages=False),  # Hide from everyone
-        user: discord.PermissionOverwrite(read_messages=True, send_messages=True),  # User can read/write
-        guild.me: discord.PermissionOverwrite(read_messages=True, send_messages=True)  # Bot can read/write
-    }
-    
-    # Add admin roles (OWNER, Admin) - they always have access to all tickets
-    for admin_role_name in ADMIN_ROLES:
-        admin_role = discord.utils.get(guild.roles, name=admin_role_name)
-        if admin_role:
-            overwrites[admin_role] = discord.PermissionOverwrite(read_messages=True, send_messages=True, manage_messages=True)
-    
-    # Add specific support role permissions
-    # Handle both single role (string) and multiple roles (list)
-    if isinstance(support_role_names, str):
-        support_role_names = [support_role_names]
-    
-    for role_name in support_role_names:
-        support_role = discord.utils.get(guild.roles, name=role_name)
-        if support_role:
-            overwrites[support_role] = discord.PermissionOverwrite(read_messages=True, send_messages=True)
-    
-    # Get category if specified
-    category = None
-    if TICKET_CATEGORY_ID:
-        category = guild.get_channel(TICKET_CATEGORY_ID)
-    
-    # Create the channel WITHOUT user ID in name
-    channel_name = f"ticket-{ticket_type}-{user.name}".lower().replace(" ", "-")
-    channel = await guild.create_text_channel(
-        name=channel_name,
-        overwrites=overwrites,
-        category=category,
-        topic=f"Support Ticket für {user.display_name} (ID: {user.id}) - {ticket_type}"
-    )
-    
-    print(f"Created ticket channel: {channel.name} for user {user.name} (ID: {user.id})")  # Debug
-    return channel
-
-class TicketClosedView(discord.ui.View):
-    """View for closed tickets by normal users (no delete button)."""
-    
-    def __init__(self):
-        super().__init__(timeout=None)
-    
-    # No buttons - normal users can't do anything with closed tickets
-
-class TicketDeleteOnlyView(discord.ui.View):
-    """View with only delete button for closed tickets."""
-    
-    def __init__(self):
-        super().__init__(timeout=None)
-    
-    @discord.ui.button(label="🗑️ Ticket löschen", style=discord.ButtonStyle.red, custom_id="delete_closed_ticket")
-    async def delete_ticket(self, interaction: discord.Interaction, button: discord.ui.Button):
-        try:
-            # Check if user has permission to delete (all roles that have access to the ticket)
-            allowed = False
-            user_roles = [role.name for role in interaction.user.roles]
-            
-            print(f"User {interaction.user.name} trying to delete ticket. Roles: {user_roles}")  # Debug
-            
-            # FIRST: Check if user has admin roles (OWNER, Admin) - they can ALWAYS delete
-            for admin_role in ADMIN_ROLES:
-                if admin_role in user_roles:
-                    allowed = True
-                    print(f"User has admin role: {admin_role} - ALLOWED TO DELETE")  # Debug
-                    break
-            
-            # SECOND: Check if user has any support role that gets pinged in tickets
-            if not allowed:
-                for ticket_type, support_roles in SUPPORT_ROLES.items():
-                    # Handle both single role (string) and multiple roles (list)
-                    if isinstance(support_roles, str):
-                        support_roles = [support_roles]
-                    
-                    for support_role in support_roles:
-                        if support_role in user_roles:
-                            allowed = True
-                            print(f"User has support role: {support_role} - ALLOWED TO DELETE")  # Debug
-                            break
-                    if allowed:
-                        break
-            
-            # If user has admin/support roles, they can delete regardless of being ticket creator
-            if allowed:
-                print(f"User {interaction.user.name} has permission - deleting ticket")  # Debug
-                await interaction.response.send_message("🗑️ Ticket wird in 5 Sekunden gelöscht...", ephemeral=False)
-                await asyncio.sleep(5)
-                await interaction.channel.delete(reason=f"Ticket gelöscht von {interaction.user}")
-                return
-            
-            # ONLY check ticket creator status if user has NO admin/support roles
-            is_ticket_creator = False
-            
-            # Method 1: Check channel name
-            if interaction.user.name.lower() in interaction.channel.name.lower():
-                is_ticket_creator = True
-                print(f"User is ticket creator by name check")  # Debug
-            
-            # Method 2: Check channel topic for user ID
-            if interaction.channel.topic and str(interaction.user.id) in interaction.channel.topic:
-                is_ticket_creator = True
-                print(f"User is ticket creator by topic check")  # Debug
-            
-            # If user is ONLY ticket creator (no support roles), deny
-            if is_ticket_creator:
-                await interaction.response.send_message("❌ Als Ticket-Ersteller kannst du das Ticket nicht löschen! Nur Support-Rollen und Admins können Tickets löschen.", ephemeral=True)
-                return
-            
-            # No permissions at all
-            await interaction.response.send_message("❌ Du hast keine Berechtigung, Tickets zu löschen! Nur gepingte Rollen (Support-Teams und Admins) können Tickets löschen.", ephemeral=True)
-            
-        except Exception as e:
-            print(f"Error in delete_ticket: {e}")
-            if not interaction.response.is_done():
-                await interaction.response.send_message("❌ Fehler beim Löschen des Tickets. Versuche es erneut.", ephemeral=True)
-
-class TicketCloseView(discord.ui.View):
-    """View with close and delete buttons for ticket channels."""
-    
-    def __init__(self):
-        super().__init__(timeout=None)
-    
-class TicketCloseView(discord.ui.View):
-    """View with close and delete buttons for ticket channels."""
-    
-    def __init__(self):
-        super().__init__(timeout=None)
-    
-    @discord.ui.button(label="🔒 Ticket schließen", style=discord.ButtonStyle.secondary, custom_id="close_ticket")
-    async def close_ticket(self, interaction: discord.Interaction, button: discord.ui.Button):
-        try:
-            # Check permissions for closing tickets
-            allowed = False
-            user_roles = [role.name for role in interaction.user.roles]
-            
-            # Check if user has admin roles (OWNER, Admin) - they can always close
-            for admin_role in ADMIN_ROLES:
-                if admin_role in user_roles:
-                    allowed = True
-                    break
-            
-            # Check if user has any support role
-            if not allowed:
-                for ticket_type, support_roles in SUPPORT_ROLES.items():
-                    # Handle both single role (string) and multiple roles (list)
-                    if isinstance(support_roles, str):
-                        support_roles = [support_roles]
-                    
-                    for support_role in support_roles:
-                        if support_role in user_roles:
-                            allowed = True
-                            break
-                    if allowed:
-                        break
-            
-            # Check if user is the ticket creator - MORE RELIABLE CHECK
-            is_ticket_creator = False
-            
-            # Method 1: Check channel name
-            if interaction.user.name.lower() in interaction.channel.name.lower():
-                is_ticket_creator = True
-            
-            # Method 2: Check channel topic for user ID
-            if interaction.channel.topic and str(interaction.user.id) in interaction.channel.topic:
-                is_ticket_creator = True
-            
-            # Method 3: Check channel permissions
-            user_perms = interaction.channel.overwrites_for(interaction.user)
-            if user_perms.read_messages is True and user_perms.send_messages is True:
-                is_ticket_creator = True
-            
-            if not allowed and is_ticket_creator:
-                allowed = True
-            
-            if not allowed:
-                await interaction.response.send_message("❌ Du hast keine Berechtigung, dieses Ticket zu schließen!", ephemeral=True)
-                return
-            
-            # Close ticket - remove ALL write permissions except for bot
-            embed = discord.Embed(
-                title="🔒 Ticket geschlossen",
-                description=f"Dieses Ticket wurde von {interaction.user.mention} geschlossen.\n\nDas Ticket kann mit dem 🗑️ Button gelöscht werden.",
-                color=discord.Color.orange()
-            )
-            await interaction.response.send_message(embed=embed)
-            
-            # Remove write permissions for EVERYONE except the bot
-            overwrites = interaction.channel.overwrites.copy()
-            
-            for user_or_role, perms in overwrites.items():
-                if user_or_role == interaction.guild.me:
-                    # Keep bot permissions
-                    continue
-                elif user_or_role == interaction.guild.default_role:
-                    # Keep @everyone hidden
-                    continue
-                else:
-                    # Remove send_messages for all users and roles
-                    new_perms = discord.PermissionOverwrite(
-                        read_messages=perms.read_messages,
-                        send_messages=False,
-                        manage_messages=perms.manage_messages if hasattr(perms, 'manage_messages') else None
-                    )
-                    overwrites[user_or_role] = new_perms
-            
-            await interaction.channel.edit(overwrites=overwrites)
-            
-            # Show appropriate view based on who has access to the channel, not who closed it
-            view = TicketDeleteOnlyView()  # Always show delete button for closed tickets
-            await interaction.edit_original_response(embed=embed, view=view)
-            
-        except Exception as e:
-            print(f"Error in close_ticket: {e}")
-            if not interaction.response.is_done():
-                await interaction.response.send_message("❌ Fehler beim Schließen des Tickets. Versuche es erneut.", ephemeral=True)
-
-    @discord.ui.button(label="🗑️ Ticket löschen", style=discord.ButtonStyle.red, custom_id="delete_ticket")
-    async def delete_ticket(self, interaction: discord.Interaction, button: discord.ui.Button):
-        try:
-            # Check if user is the ticket creator - they CANNOT delete
-            is_ticket_creator = False
-            
-            # Method 1: Check channel name
-            if interaction.user.name.lower() in interaction.channel.name.lower():
-                is_ticket_creator = True
-            
-            # Method 2: Check channel topic for user ID
-            if interaction.channel.topic and str(interaction.user.id) in interaction.channel.topic:
-                is_ticket_creator = True
-            
-            # Method 3: Check if user has specific ticket creator permissions
-            user_perms = interaction.channel.overwrites_for(interaction.user)
-            if (user_perms.read_messages is True and user_perms.send_messages is not None and 
-                not any(role.name in [role for roles in SUPPORT_ROLES.values() for role in (roles if isinstance(roles, list) else [roles])] + ADMIN_ROLES for role in interaction.user.roles)):
-                is_ticket_creator = True
-            
-            # Ticket creator cannot delete
-            if is_ticket_creator:
-                await interaction.response.send_message("❌ Als Ticket-Ersteller kannst du das Ticket nicht löschen! Nur Support-Rollen und Admins können Tickets löschen.", ephemeral=True)
-                return
-            
-            # Check if user has permission to delete (all roles that have access to the ticket)
-            allowed = False
-            user_roles = [role.name for role in interaction.user.roles]
-            
-            # Check if user has admin roles (OWNER, Admin) - they are pinged in all tickets
-            for admin_role in ADMIN_ROLES:
-                if admin_role in user_roles:
-                    allowed = True
-                    break
-            
-            # Check if user has any support role that gets pinged in tickets
-            if not allowed:
-                for ticket_type, support_roles in SUPPORT_ROLES.items():
-                    # Handle both single role (string) and multiple roles (list)
-                    if isinstance(support_roles, str):
-                        support_roles = [support_roles]
-                    
-                    for support_role in support_roles:
-                        if support_role in user_roles:
-                            allowed = True
-                            break
-                    if allowed:
-                        break
-            
-            if not allowed:
-                await interaction.response.send_message("❌ Du hast keine Berechtigung, Tickets zu löschen! Nur gepingte Rollen (Support-Teams und Admins) können Tickets löschen.", ephemeral=True)
-                return
-            
-            # Delete the ticket
-            await interaction.response.send_message("🗑️ Ticket wird in 5 Sekunden gelöscht...", ephemeral=False)
-            await asyncio.sleep(5)
-            await interaction.channel.delete(reason=f"Ticket gelöscht von {interaction.user}")
-            
-        except Exception as e:
-            print(f"Error in delete_ticket: {e}")
-            if not interaction.response.is_done():
-                await interaction.response.send_message("❌ Fehler beim Löschen des Tickets. Versuche es erneut.", ephemeral=True)
-
-# --- Discord UI Components (Buttons) ---
-
-# Define a View for the buttons
-class TicketSystemView(discord.ui.View):
-    def __init__(self):
-        super().__init__(timeout=None) # Keep the view persistent
-
-    @discord.ui.button(label="General Support", style=discord.ButtonStyle.blurple, emoji="🛠️", custom_id="general_support")
-    async def general_support_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-        try:
-            # Check if user already has ANY ticket (not just general support)
-            existing_ticket = await has_any_existing_ticket(interaction.guild, interaction.user)
-            if existing_ticket:
-                await interaction.response.send_message(
-                    f"❌ Du hast bereits ein offenes Ticket: {existing_ticket.mention}\n"
-                    f"Bitte schließe dein aktuelles Ticket, bevor du ein neues erstellst.", 
-                    ephemeral=True
-                )
-                return
-            
-            # Create ticket channel
-            channel = await create_ticket_channel(
-                interaction.guild, 
-                interaction.user, 
-                "general-support", 
-                SUPPORT_ROLES['general']
-            )
-            
-            await interaction.response.send_message(f"🛠️ General Support Ticket erstellt: {channel.mention}", ephemeral=True)
-            
-            # Send welcome message in the new channel
-            embed = discord.Embed(
-                title="🛠️ General Support Ticket",
-                description=f"Hallo {interaction.user.mention}!\n\nBeschreibe dein Problem so detailliert wie möglich. Ein Support-Mitarbeiter wird dir bald helfen.",
-                color=discord.Color.blue()
-            )
-            embed.add_field(name="Ticket erstellt von", value=interaction.user.display_name, inline=True)
-            embed.add_field(name="Kategorie", value="General Support", inline=True)
-            
-            # Smart mention system based on roles and ticket type
-            mentions = [interaction.user.mention]
-            
-            # Always mention admin roles (OWNER, Admin) - they get pinged for all tickets
-            for admin_role_name in ADMIN_ROLES:
-                admin_role = discord.utils.get(interaction.guild.roles, name=admin_role_name)
-                if admin_role:
-                    mentions.append(admin_role.mention)
-            
-            # Mention specific support roles for this ticket type
-            support_roles = SUPPORT_ROLES['general']
-            if isinstance(support_roles, str):
-                support_roles = [support_roles]
-            
-            for role_name in support_roles:
-                support_role = discord.utils.get(interaction.guild.roles, name=role_name)
-                if support_role:
-                    mentions.append(support_role.mention)
-            
-            mention_text = " ".join(mentions)
-            await channel.send(mention_text, embed=embed, view=TicketCloseView())
-            
-        except Exception as e:
-            print(f"Error in general_support_button: {e}")
-            if not interaction.response.is_done():
-                await interaction.response.send_message("❌ Fehler beim Erstellen des Tickets. Versuche es erneut.", ephemeral=True)
-
-    @discord.ui.button(label="Report User", style=discord.ButtonStyle.red, emoji="⚠️", custom_id="report_user")
-    async def report_user_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-        try:
-            # Check if user already has ANY ticket (not just user report)
-            existing_ticket = await has_any_existing_ticket(interaction.guild, interaction.user)
-            if existing_ticket:
-                await interaction.response.send_message(
-                    f"❌ Du hast bereits ein offenes Ticket: {existing_ticket.mention}\n"
-                    f"Bitte schließe dein aktuelles Ticket, bevor du ein neues erstellst.", 
-                    ephemeral=True
-                )
-                return
-            
-            # Create ticket channel
-            channel = await create_ticket_channel(
-                interaction.guild, 
-                interaction.user, 
-                "user-report", 
-                SUPPORT_ROLES['report']
-            )
-            
-            await interaction.response.send_message(f"⚠️ User Report Ticket erstellt: {channel.mention}", ephemeral=True)
-            
-            # Send welcome message in the new channel
-            embed = discord.Embed(
-                title="⚠️ User Report Ticket",
-                description=f"Hallo {interaction.user.mention}!\n\nBitte gib folgende Informationen an:\n• **Gemeldeter User:** (Name/ID)\n• **Grund der Meldung:**\n• **Beweise:** (Screenshots, Links, etc.)",
-                color=discord.Color.red()
-            )
-            embed.add_field(name="Ticket erstellt von", value=interaction.user.display_name, inline=True)
-            embed.add_field(name="Kategorie", value="User Report", inline=True)
-            
-            # Smart mention system based on roles and ticket type
-            mentions = [interaction.user.mention]
-            
-            # Always mention admin roles (OWNER, Admin) - they get pinged for all tickets
-            for admin_role_name in ADMIN_ROLES:
-                admin_role = discord.utils.get(interaction.guild.roles, name=admin_role_name)
-                if admin_role:
-                    mentions.append(admin_role.mention)
-            
-            # Mention specific support role for user reports
-            support_role = discord.utils.get(interaction.guild.roles, name=SUPPORT_ROLES['report'])
-            if support_role:
-                mentions.append(support_role.mention)
-            
-            mention_text = " ".join(mentions)
-            await channel.send(mention_text, embed=embed, view=TicketCloseView())
-            
-        except Exception as e:
-            print(f"Error in report_user_button: {e}")
-            if not interaction.response.is_done():
-                await interaction.response.send_message("❌ Fehler beim Erstellen des Tickets. Versuche es erneut.", ephemeral=True)
-
-    @discord.ui.button(label="Unban Antrag", style=discord.ButtonStyle.green, emoji="🔓", custom_id="unban_request")
-    async def unban_request_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-        try:
-            # Check if user already has ANY ticket (not just unban request)
-            existing_ticket = await has_any_existing_ticket(interaction.guild, interaction.user)
-            if existing_ticket:
-                await interaction.response.send_message(
-                    f"❌ Du hast bereits ein offenes Ticket: {existing_ticket.mention}\n"
-                    f"Bitte schließe dein aktuelles Ticket, bevor du ein neues erstellst.", 
-                    ephemeral=True
-                )
-                return
-            
-            # Create ticket channel
-            channel = await create_ticket_channel(
-                interaction.guild, 
-                interaction.user, 
-                "unban-antrag", 
-                SUPPORT_ROLES['unban']
-            )
-            
-            await interaction.response.send_message(f"🔓 Unban Antrag erstellt: {channel.mention}", ephemeral=True)
-            
-            # Send welcome message in the new channel
-            embed = discord.Embed(
-                title="🔓 Unban Antrag Ticket",
-                description=f"Hallo {interaction.user.mention}!\n\nBitte fülle folgende Informationen aus:\n• **Gebannter Account:** (Name/ID)\n• **Grund des Banns:**\n• **Warum solltest du entbannt werden:**\n• **Wirst du die Regeln befolgen:**",
-                color=discord.Color.green()
-            )
-            embed.add_field(name="Ticket erstellt von", value=interaction.user.display_name, inline=True)
-            embed.add_field(name="Kategorie", value="Unban Antrag", inline=True)
-            
-            # Smart mention system based on roles and ticket type
-            mentions = [interaction.user.mention]
-            
-            # Always mention admin roles (OWNER, Admin) - they get pinged for all tickets
-            for admin_role_name in ADMIN_ROLES:
-                admin_role = discord.utils.get(interaction.guild.roles, name=admin_role_name)
-                if admin_role:
-                    mentions.append(admin_role.mention)
-            
-            # Mention specific support role for unban requests
-            support_role = discord.utils.get(interaction.guild.roles, name=SUPPORT_ROLES['unban'])
-            if support_role:
-                mentions.append(support_role.mention)
-            
-            mention_text = " ".join(mentions)
-            await channel.send(mention_text, embed=embed, view=TicketCloseView())
-            
-        except Exception as e:
-            print(f"Error in unban_request_button: {e}")
-            if not interaction.response.is_done():
-                await interaction.response.send_message("❌ Fehler beim Erstellen des Tickets. Versuche es erneut.", ephemeral=True)
-
-# --- Reload function ---
-async def reload_bot():
-    """Reloads the bot by restarting the Python process."""
-    print("Bot wird neu geladen...")
-    await client.close()
-    
-    # Restart the Python process
-    os.execv(sys.executable, ['python'] + sys.argv)
+from threading import Thread
+from flask import Flask, Response
+import math
+import time
+import logging
+import aiohttp
+import aiohttp.web
+
+from bot import (
+    category_pool, client, deletion_scheduler, guild_configs, handler_profiler, idle_sweeper, invalidate_role_cache, invalidate_staff_decision, invalidate_staff_permissions,
+    GUILD_CONFIG_WATCH_INTERVAL, is_ticket_staff, log, recover_tickets, report_memory_usage, shard_status, start_event_loop_lag_monitor, SHARD_COUNT,
+    ticket_stats, ticket_store,
+)
+from metrics import render_metrics
+from sharding import run_shard_workers
+import commands
+import reloader
+import tickets
+
+startup_timer.mark("modules")
+
+web_log = logging.getLogger("bot.web")
 
 # --- Discord Bot Events and Commands ---
 
+# Guilds reconciled since the gateway (re)connected - on_ready only does the ones no guild event covered
+reconciled_guilds = set()
+
+def reconcile_guild(guild):
+    """Reconciles the stored tickets, ticket categories and statistics of a guild with its channels."""
+    # An unavailable guild has no channels - every ticket would look deleted
+    if guild.unavailable:
+        return
+    recover_tickets(guild)
+    category_pool.build(guild)
+    ticket_stats.build(guild.id, ticket_store.tickets_in_guild(guild.id))
+    reconciled_guilds.add(guild.id)
+
 @client.event
 async def on_ready():
     """Called when the bot successfully connects to Discord."""
-    print(f'{client.user} has successfully logged in!')
-    await client.change_presence(activity=discord.Game(name="mit Python"))
+    log.info("%s has successfully logged in!", client.user)
 
-    # Add the persistent views when the bot starts
-    # This is crucial for buttons to work after a bot restart
-    try:
-        client.add_view(TicketSystemView())
-        client.add_view(TicketCloseView())
-        client.add_view(TicketDeleteOnlyView())
-        client.add_view(TicketClosedView())
-        print("Persistent Views loaded successfully!")
-    except Exception as e:
-        print(f"Error loading persistent views: {e}")
+    # Guilds still unavailable now are reconciled by on_guild_available once they arrive
+    for guild in client.guilds:
+        if guild.id not in reconciled_guilds:
+            reconcile_guild(guild)
+
+    if not startup_timer.finished:
+        if last_guild_available is not None:
+            startup_timer.mark("guilds_available", at=last_guild_available)
+        startup_timer.mark("first_ready")
+        startup_timer.finish()
+    await report_memory_usage()
+
+# Time the last guild became available before the first on_ready (for the startup report)
+last_guild_available = None
+
+@client.event
+async def on_connect():
+    """Called when the gateway connection is up (again), before the guilds arrive."""
+    startup_timer.mark("gateway_connect")
+    # A new session sends every guild again
+    reconciled_guilds.clear()
+
+@client.event
+async def on_guild_available(guild):
+    """Called for every guild that becomes available (at startup and after outages)."""
+    global last_guild_available
+    if not startup_timer.finished:
+        last_guild_available = time.perf_counter()
+    reconcile_guild(guild)
+
+@client.event
+async def on_guild_join(guild):
+    """Picks up the existing tickets and ticket categories of a guild the bot was just added to."""
+    reconcile_guild(guild)
+
+@client.event
+async def on_guild_remove(guild):
+    """Drops the cached roles, staff permissions, category counts and ticket statistics of a guild the bot was removed from."""
+    reconciled_guilds.discard(guild.id)
+    category_pool.forget(guild)
+    ticket_stats.forget(guild.id)
+    invalidate_role_cache(guild)
+    invalidate_staff_permissions(guild)
+
+@client.event
+async def on_member_update(before, after):
+    """Forgets the memoized staff decision of a member whose roles changed."""
+    if before.roles != after.roles:
+        invalidate_staff_decision(after)
+
+@client.event
+async def on_member_remove(member):
+    """Forgets the memoized staff decision of a member who left."""
+    invalidate_staff_decision(member)
+
+@client.event
+async def on_guild_role_create(role):
+    """Drops the cached roles, ticket templates and staff permissions of the guild."""
+    invalidate_role_cache(role.guild)
+    invalidate_staff_permissions(role.guild)
+
+@client.event
+async def on_guild_role_update(before, after):
+    """Drops the cached roles, ticket templates and staff permissions of the guild."""
+    invalidate_role_cache(after.guild)
+    invalidate_staff_permissions(after.guild)
+
+@client.event
+async def on_guild_role_delete(role):
+    """Drops the cached roles, ticket templates and staff permissions of the guild."""
+    invalidate_role_cache(role.guild)
+    invalidate_staff_permissions(role.guild)
+
+@client.event
+async def on_guild_channel_create(channel):
+    """Counts a new channel in its ticket category."""
+    category_pool.channel_created(channel)
+
+@client.event
+async def on_guild_channel_delete(channel):
+    """Marks the ticket of a deleted channel as deleted (however the channel was deleted)."""
+    ticket = ticket_store.delete_ticket(channel.id)
+    if ticket is not None:
+        ticket_stats.ticket_deleted(ticket)
+    category_pool.channel_deleted(channel)
 
+@client.event
+async def on_guild_channel_update(before, after):
+    """Moves the count of a channel that was moved to another category."""
+    category_pool.channel_updated(before, after)
 
 @client.event
 async def on_interaction(interaction):
@@ -584,7 +145,7 @@ async def on_interaction(interaction):
         # Let the normal interaction handling proceed
         pass
     except Exception as e:
-        print(f"Interaction error: {e}")
+        log.exception("Interaction error: %s", e)
         if not interaction.response.is_done():
             await interaction.response.send_message("❌ Ein Fehler ist aufgetreten. Versuche es erneut oder kontaktiere einen Admin.", ephemeral=True)
 
@@ -595,126 +156,44 @@ async def on_message(message):
     if message.author == client.user:
         return
 
-    # Basic example commands
-    if message.content.startswith('!hallo'):
-        await message.delete()  # Delete command message
-        await message.channel.send('Hallo!', delete_after=5)  # Auto-delete after 5 seconds
-    elif message.content.startswith('!ping'):
-        await message.delete()  # Delete command message
-        await message.channel.send('Pong!', delete_after=5)  # Auto-delete after 5 seconds
-    elif message.content.startswith('!info'):
-        await message.delete()  # Delete command message
-        await message.channel.send(f'I am a Discord bot, created by {message.author.display_name}.', delete_after=5)
-
-    # Clear command to delete messages
-    elif message.content.startswith('!clear'):
-        # Check if user has manage messages permission
-        if not message.author.guild_permissions.manage_messages:
-            # Send ephemeral-like message by DMing the user
-            try:
-                await message.author.send("❌ Du hast keine Berechtigung für diesen Befehl!")
-            except:
-                # If DM fails, send in channel but delete quickly
-                error_msg = await message.channel.send("❌ Du hast keine Berechtigung für diesen Befehl!")
-                await asyncio.sleep(3)
-                await error_msg.delete()
-            await message.delete()
-            return
-        
-        # Parse the number of messages to delete
-        try:
-            # Split the command to get the number
-            parts = message.content.split()
-            if len(parts) > 1:
-                amount = int(parts[1])
-                if amount > 100:
-                    amount = 100  # Discord limit
-                elif amount < 1:
-                    amount = 1
-            else:
-                amount = 1  # Default to 1 if no number specified
-        except ValueError:
-            try:
-                await message.author.send("❌ Bitte gib eine gültige Zahl an! Beispiel: `!clear 10`")
-            except:
-                error_msg = await message.channel.send("❌ Bitte gib eine gültige Zahl an! Beispiel: `!clear 10`")
-                await asyncio.sleep(3)
-                await error_msg.delete()
-            await message.delete()
-            return
-        
-        # Delete the command message first
-        await message.delete()
-        
-        # Delete the specified number of messages
-        deleted_messages = await message.channel.purge(limit=amount)
-        
-        # Send success message
-        embed = discord.Embed(
-            title="✅ Aktion erfolgreich!",
-            description=f"Somit hast du {len(deleted_messages)} Nachrichten aus diesem Kanal gelöscht.",
-            color=discord.Color.green()
-        )
-        embed.set_footer(text="GalaxyBot", icon_url=client.user.avatar.url if client.user.avatar else None)
-        
-        # Send the embed and delete it after 5 seconds
-        success_msg = await message.channel.send(embed=embed)
-        await asyncio.sleep(5)
-        await success_msg.delete()
-
-    # Reload command - nur für Administratoren/Owner
-    elif message.content.startswith('!reload'):
-        # Überprüfe, ob der Benutzer Berechtigung hat (z.B. Administrator oder Bot Owner)
-        if message.author.guild_permissions.administrator or message.author.id == int(os.getenv('BOT_OWNER_ID', '0')):
-            await message.delete()  # Delete command message
-            reload_msg = await message.channel.send("🔄 Bot wird neu geladen...")
-            await asyncio.sleep(2)
-            await reload_msg.delete()
-            await reload_bot()
-        else:
-            try:
-                await message.author.send("❌ Du hast keine Berechtigung für diesen Befehl!")
-            except:
-                error_msg = await message.channel.send("❌ Du hast keine Berechtigung für diesen Befehl!")
-                await asyncio.sleep(3)
-                await error_msg.delete()
-            await message.delete()
-
-    # New command to send the Ticket System message with buttons (Admin only)
-    elif message.content.startswith('!ticketsystem'):
-        # Check if user has admin permissions
-        if not (message.author.guild_permissions.administrator or message.author.id == int(os.getenv('BOT_OWNER_ID', '0'))):
-            try:
-                await message.author.send("❌ Du hast keine Berechtigung für diesen Befehl! Nur Administratoren können das Ticket-System erstellen.")
-            except:
-                error_msg = await message.channel.send("❌ Du hast keine Berechtigung für diesen Befehl! Nur Administratoren können das Ticket-System erstellen.")
-                await asyncio.sleep(3)
-                await error_msg.delete()
-            await message.delete()
-            return
-        
-        # Create the Embed
-        embed = discord.Embed(
-            title="Server_Name TICKETSYSTEM ✉️",
-            description=(
-                "Wähle die passende Kategorie für dein Anliegen:\n\n"
-                "🛠️ **General Support**\n"
-                "Hilfe bei allgemeinen Fragen\n\n"
-                "⚠️ **Report User**\n"
-                "Melde Regelverstöße\n\n"
-                "🔓 **Unban Antrag**\n"
-                "Stelle einen Antrag auf Entbannung\n\n"
-                "Klicke auf einen Button, um zu starten."
-            ),
-            color=discord.Color.blue() # You can choose any color
-        )
-
-        # Send the message with the Embed and the View (buttons)
-        await message.channel.send(embed=embed, view=TicketSystemView())
-        await message.delete() # Optional: delete the command message to keep the channel clean
+    # First staff answer in a ticket (a dict lookup for every other message)
+    if (message.guild is not None and ticket_stats.is_awaiting_response(message.guild.id, message.channel.id)
+            and not message.author.bot and is_ticket_staff(message.author)):
+        ticket_stats.staff_responded(message.guild.id, message.channel.id, message.author.id)
+
+    # Looked up on every call so a hot reload of the commands module takes effect right away
+    await commands.handle_message(message)
 
 # --- Functions for 24/7 operation (via hosting services) ---
 
+# "flask" runs the Flask app in a separate thread (default), "async" serves the same
+# endpoints with aiohttp on the bot's own event loop (no extra thread), "none" disables both
+WEB_SERVER = os.getenv('WEB_SERVER', 'flask').lower()
+
+# The bot counts as not ready while the gateway heartbeat is slower than this (seconds)
+READY_MAX_LATENCY = float(os.getenv('READY_MAX_LATENCY', '5'))
+
+def get_web_port():
+    """Returns the port for the web server."""
+    # Try to get port from Pterodactyl environment variables
+    return int(os.getenv('SERVER_PORT', os.getenv('PORT', os.getenv('PTERODACTYL_PORT', 25591))))
+
+def readiness_status():
+    """Returns (is_ready, details) based on the gateway connection."""
+    connected = client.is_ready() and not client.is_closed()
+    latency = client.latency  # NaN/inf while no heartbeat has been acknowledged (average when sharded)
+    has_latency = math.isfinite(latency)
+    shards = shard_status()
+    details = {
+        "ready": (connected and has_latency and latency < READY_MAX_LATENCY
+                  and all(shard["connected"] for shard in shards)),
+        "gateway_connected": connected,
+        "latency": latency if has_latency else None,
+        "guilds": len(client.guilds),
+        "shards": shards,
+    }
+    return details["ready"], details
+
 app = Flask(__name__)
 
 @app.route('/')
@@ -722,28 +201,127 @@ def home():
     """Home page of the Flask app, simply to confirm that the app is running."""
     return "I am alive!"
 
+@app.route('/metrics')
+def prometheus_metrics():
+    """Exposes the bot's counters and latency histograms in Prometheus text format."""
+    return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
+
+@app.route('/perf')
+def flask_perf():
+    """Rolling latency percentiles per button custom_id and !command."""
+    return handler_profiler.snapshot()
+
+@app.route('/ticketstats')
+def flask_ticketstats():
+    """Open tickets per type, oldest open ticket and first response times per guild."""
+    return ticket_stats.summaries()
+
+@app.route('/readyz')
+def flask_readyz():
+    """Readiness: 200 only while the bot is connected to the gateway, 503 otherwise."""
+    ready, details = readiness_status()
+    return details, 200 if ready else 503
+
 def run_flask():
     """Starts the Flask web server in a separate thread."""
-    # Try to get port from Pterodactyl environment variables
-    port_nenne = int(os.getenv('SERVER_PORT', os.getenv('PORT', os.getenv('PTERODACTYL_PORT', 25591))))
-    print(f"Flask server starting on port: {port_nenne}")
+    port_nenne = get_web_port()
+    web_log.info("Flask server starting on port: %s", port_nenne)
     app.run(host='0.0.0.0', port=port_nenne)
 
+# --- Async health server (runs on the bot's event loop) ---
+
+async def web_home(request):
+    """Liveness: answering at all means the event loop is not stuck."""
+    return aiohttp.web.Response(text="I am alive!")
+
+async def web_healthz(request):
+    """Liveness probe - same as /, but JSON."""
+    return aiohttp.web.json_response({"alive": True})
+
+async def web_readyz(request):
+    """Readiness: 200 only while the bot is connected to the gateway, 503 otherwise."""
+    ready, details = readiness_status()
+    return aiohttp.web.json_response(details, status=200 if ready else 503)
+
+async def web_metrics(request):
+    """Exposes the bot's counters and latency histograms in Prometheus text format."""
+    return aiohttp.web.Response(text=render_metrics(), content_type="text/plain", charset="utf-8")
+
+async def web_perf(request):
+    """Rolling latency percentiles per button custom_id and !command."""
+    return aiohttp.web.json_response(handler_profiler.snapshot())
+
+async def web_ticketstats(request):
+    """Open tickets per type, oldest open ticket and first response times per guild."""
+    return aiohttp.web.json_response(ticket_stats.summaries())
+
+web_runner = None
+
+async def start_async_web_server():
+    """Starts the aiohttp health server on the running (bot) event loop."""
+    global web_runner
+    web_app = aiohttp.web.Application()
+    web_app.add_routes([
+        aiohttp.web.get('/', web_home),
+        aiohttp.web.get('/healthz', web_healthz),
+        aiohttp.web.get('/readyz', web_readyz),
+        aiohttp.web.get('/metrics', web_metrics),
+        aiohttp.web.get('/perf', web_perf),
+        aiohttp.web.get('/ticketstats', web_ticketstats),
+    ])
+    web_runner = aiohttp.web.AppRunner(web_app, access_log=None)
+    await web_runner.setup()
+    port = get_web_port()
+    await aiohttp.web.TCPSite(web_runner, '0.0.0.0', port).start()
+    web_log.info("Async health server listening on port: %s", port)
+
+@client.event
+async def setup_hook():
+    """Runs once after login, before the gateway connects."""
+    startup_timer.mark("login")
+    deletion_scheduler.start()
+    start_event_loop_lag_monitor()
+    await ticket_store.load()
+    # Looked up on every close so a hot reload of the tickets module takes effect right away
+    idle_sweeper.start(lambda channel: tickets.close_idle_ticket(channel))
+    # Per-guild settings are applied as soon as their file changes, without a restart
+    guild_configs.start(GUILD_CONFIG_WATCH_INTERVAL)
+
+    # Register the persistent views before the first event arrives, so their buttons work right
+    # after a restart (and clicks that come in while the guilds are still loading are handled)
+    reloader.register_persistent_views()
+    if WEB_SERVER == 'async':
+        await start_async_web_server()
+    startup_timer.mark("setup")
+
 def run_discord_bot():
     """Starts the Discord bot with the stored token."""
     DISCORD_TOKEN = os.getenv('DISCORD_TOKEN')
     if DISCORD_TOKEN is None:
-        print("Error: DISCORD_TOKEN not found. Please ensure you have a .env file with DISCORD_TOKEN='YOUR_BOT_TOKEN' in the same directory.")
+        log.error("Error: DISCORD_TOKEN not found. Please ensure you have a .env file with DISCORD_TOKEN='YOUR_BOT_TOKEN' in the same directory.")
         return
     try:
-        client.run(DISCORD_TOKEN)
+        # log_handler=None keeps discord.py's own logging on our queue instead of a second stderr handler
+        client.run(DISCORD_TOKEN, log_handler=None)
     except discord.errors.LoginFailure:
-        print("Error: Invalid bot token. Please check your DISCORD_TOKEN in the .env file.")
+        log.error("Error: Invalid bot token. Please check your DISCORD_TOKEN in the .env file.")
     except Exception as e:
-        print(f"An unexpected error occurred: {e}")
+        log.exception("An unexpected error occurred: %s", e)
 
 if __name__ == '__main__':
-    flask_thread = Thread(target=run_flask)
-    flask_thread.start()
+    # SHARD_WORKERS=N splits the shards over N worker processes running this script;
+    # this process then only supervises them (ports PORT, PORT+1, ... for their web servers)
+    shard_workers = int(os.getenv('SHARD_WORKERS', '0'))
+    if shard_workers > 1:
+        DISCORD_TOKEN = os.getenv('DISCORD_TOKEN')
+        if DISCORD_TOKEN is None:
+            log.error("Error: DISCORD_TOKEN not found. Please ensure you have a .env file with DISCORD_TOKEN='YOUR_BOT_TOKEN' in the same directory.")
+            sys.exit(1)
+        run_shard_workers(os.path.abspath(__file__), DISCORD_TOKEN, shard_workers, SHARD_COUNT, get_web_port())
+        sys.exit(0)
+
+    if WEB_SERVER == 'flask':
+        flask_thread = Thread(target=run_flask)
+        flask_thread.start()
 
     run_discord_bot()
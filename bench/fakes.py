@@ -0,0 +1,176 @@
+import itertools
+
+import discord
+
+# In-memory stand-ins for the discord.py objects the ticket and command code touches.
+# They only implement what the bot uses and every API call returns immediately, so the
+# benchmarks measure the bot's own code and not the network.
+
+_ids = itertools.count(1_000_000_000_000_000)
+
+def next_id():
+    return next(_ids)
+
+class FakeRole:
+    def __init__(self, guild, name, role_id=None):
+        self.id = role_id or next_id()
+        self.guild = guild
+        self.name = name
+
+    @property
+    def mention(self):
+        return f"<@&{self.id}>"
+
+class FakeMember:
+    def __init__(self, guild, name, roles=(), administrator=False):
+        self.id = next_id()
+        self.guild = guild
+        self.name = name
+        self.display_name = name
+        self.bot = False
+        self.roles = [guild.default_role, *roles]
+        self.guild_permissions = discord.Permissions(administrator=administrator, manage_messages=administrator)
+
+    @property
+    def mention(self):
+        return f"<@{self.id}>"
+
+    async def send(self, *args, **kwargs):
+        return FakeMessage(self, None, args[0] if args else "")
+
+class FakeMessage:
+    def __init__(self, author, channel, content):
+        self.id = next_id()
+        self.author = author
+        self.channel = channel
+        self.guild = channel.guild if channel is not None else None
+        self.content = content
+
+    async def delete(self, **kwargs):
+        pass
+
+class FakeTextChannel:
+    def __init__(self, guild, name, category_id=None, topic=None, overwrites=None):
+        self.id = next_id()
+        self.guild = guild
+        self.name = name
+        self.category_id = category_id
+        self.topic = topic
+        self.overwrites = dict(overwrites or {})
+
+    @property
+    def mention(self):
+        return f"<#{self.id}>"
+
+    def overwrites_for(self, target):
+        return self.overwrites.get(target, discord.PermissionOverwrite())
+
+    async def send(self, content=None, **kwargs):
+        return FakeMessage(self.guild.me, self, content or "")
+
+    async def edit(self, **kwargs):
+        if "overwrites" in kwargs:
+            self.overwrites = dict(kwargs["overwrites"])
+
+    async def delete(self, **kwargs):
+        self.guild.remove_channel(self)
+
+    async def history(self, **kwargs):
+        return
+        yield
+
+class FakeCategory(FakeTextChannel):
+    pass
+
+class FakeGuild:
+    """A guild with `channels` text channels, `members` members and the configured staff roles."""
+
+    def __init__(self, channels, members, staff_role_names, staff_share=0.01):
+        self.id = next_id()
+        self.name = "Benchmark Guild"
+        self.default_role = FakeRole(self, "@everyone", role_id=self.id)
+        self.roles = [self.default_role] + [FakeRole(self, name) for name in staff_role_names]
+        self.roles += [FakeRole(self, f"role-{i}") for i in range(200)]
+        self._channels = {}
+        self._members = {}
+
+        self.me = self.add_member("Ticket Bot")
+        staff_roles = self.roles[1:1 + len(staff_role_names)]
+        other_roles = self.roles[1 + len(staff_role_names):]
+        staff_every = max(1, int(1 / staff_share)) if staff_share else 0
+        for i in range(members):
+            roles = [other_roles[i % len(other_roles)], other_roles[(i * 7) % len(other_roles)]]
+            if staff_every and i % staff_every == 0:
+                roles.append(staff_roles[i % len(staff_roles)])
+            self.add_member(f"member-{i}", roles)
+        for i in range(channels):
+            self.add_channel(FakeTextChannel(self, f"channel-{i}"))
+
+    # --- Lookups ---
+
+    @property
+    def members(self):
+        return list(self._members.values())
+
+    @property
+    def text_channels(self):
+        return [channel for channel in self._channels.values() if not isinstance(channel, FakeCategory)]
+
+    @property
+    def categories(self):
+        return [channel for channel in self._channels.values() if isinstance(channel, FakeCategory)]
+
+    def get_channel(self, channel_id):
+        return self._channels.get(channel_id)
+
+    def get_member(self, member_id):
+        return self._members.get(member_id)
+
+    # --- Mutations ---
+
+    def add_member(self, name, roles=(), administrator=False):
+        member = FakeMember(self, name, roles, administrator)
+        self._members[member.id] = member
+        return member
+
+    def add_channel(self, channel):
+        self._channels[channel.id] = channel
+        return channel
+
+    def remove_channel(self, channel):
+        self._channels.pop(channel.id, None)
+
+    async def create_text_channel(self, name, overwrites=None, category=None, topic=None, **kwargs):
+        category_id = category.id if category is not None else None
+        return self.add_channel(FakeTextChannel(self, name, category_id, topic, overwrites))
+
+    async def create_category(self, name, overwrites=None, **kwargs):
+        return self.add_channel(FakeCategory(self, name, overwrites=overwrites))
+
+class FakeResponse:
+    def __init__(self):
+        self._done = False
+
+    def is_done(self):
+        return self._done
+
+    async def send_message(self, *args, **kwargs):
+        self._done = True
+
+    async def defer(self, **kwargs):
+        self._done = True
+
+class FakeFollowup:
+    async def send(self, *args, **kwargs):
+        pass
+
+class FakeInteraction:
+    def __init__(self, guild, user, channel=None):
+        self.guild = guild
+        self.user = user
+        self.channel = channel
+        self.response = FakeResponse()
+        self.followup = FakeFollowup()
+
+    async def edit_original_response(self, **kwargs):
+        pass
@@ -0,0 +1,247 @@
+"""End-to-end load test: the real bot (app.py) against the local mock Discord.
+
+    python bench/load_test.py                          # 1000 ticket clicks per minute, then close and delete them
+    python bench/load_test.py --clicks 300 --rate 3000 --scenarios tickets
+    python bench/load_test.py --channel-create-limit 0 # no rate limit on channel creation
+
+Starts bench/mock_discord.py in this process and app.py as a child process pointed at it,
+replays button clicks at a fixed rate and reports the time-to-acknowledge (dispatch of
+INTERACTION_CREATE until the interaction callback arrives) per custom_id. Discord drops
+interactions that are not acknowledged within 3 seconds, so those are counted as well.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+import aiohttp
+
+from mock_discord import MockDiscord
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Discord's deadline for the first response to an interaction
+ACK_DEADLINE = 3.0
+
+def staff_role_names():
+    """Default admin roles plus every support role from the ticket type registry."""
+    with open(os.path.join(ROOT, "ticket_types.json"), encoding="utf-8") as f:
+        ticket_types = json.load(f)
+    with open(os.path.join(ROOT, "guild_config.json"), encoding="utf-8") as f:
+        names = list(json.load(f).get("default", {}).get("admin_roles", ["OWNER", "Admin"]))
+    for config in ticket_types.values():
+        roles = config["support_roles"]
+        for name in [roles] if isinstance(roles, str) else roles:
+            if name not in names:
+                names.append(name)
+    return names, [config["custom_id"] for config in ticket_types.values()]
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+class LoadTest:
+    def __init__(self, args):
+        self.args = args
+        self.role_names, self.ticket_custom_ids = staff_role_names()
+        limits = None
+        if args.channel_create_limit is not None:
+            from mock_discord import DEFAULT_LIMITS
+            limits = dict(DEFAULT_LIMITS)
+            if args.channel_create_limit:
+                limits[("POST", "/guilds/{guild_id}/channels")] = (args.channel_create_limit, 5.0)
+            else:
+                del limits[("POST", "/guilds/{guild_id}/channels")]
+        self.mock = MockDiscord(members=args.members, staff_roles=self.role_names, limits=limits,
+                                global_limit=args.global_limit)
+        # custom_id -> list of seconds until acknowledged (None = never acknowledged)
+        self.results = {}
+        self.bot_process = None
+
+    # --- Bot process ---
+
+    def start_bot(self, tmp):
+        env = dict(
+            os.environ,
+            DISCORD_TOKEN="mock-token",
+            DISCORD_API_BASE_URL=self.mock.api_url,
+            DISCORD_GATEWAY_URL=self.mock.gateway_url,
+            WEB_SERVER="async",
+            SERVER_PORT=str(self.args.port + 1),
+            SHARD_WORKERS="0",
+            TICKET_DB_FILE=os.path.join(tmp, "tickets.db"),
+            DELETION_QUEUE_FILE=os.path.join(tmp, "pending_deletions.json"),
+            TRANSCRIPT_DIR=os.path.join(tmp, "transcripts"),
+            MEMORY_REPORT_FILE=os.path.join(tmp, "memory_report.json"),
+            LOG_LEVEL=self.args.bot_log_level,
+        )
+        self.bot_process = subprocess.Popen([sys.executable, os.path.join(ROOT, "app.py")], env=env, cwd=ROOT)
+
+    def stop_bot(self):
+        if self.bot_process and self.bot_process.poll() is None:
+            self.bot_process.terminate()
+            try:
+                self.bot_process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.bot_process.kill()
+
+    async def wait_for_bot(self, timeout=60):
+        """Waits until the bot's /readyz answers 200 (gateway connected and on_ready done)."""
+        deadline = time.monotonic() + timeout
+        url = f"http://127.0.0.1:{self.args.port + 1}/readyz"
+        async with aiohttp.ClientSession() as session:
+            while True:
+                if self.bot_process.poll() is not None:
+                    unknown = ", ".join(self.mock.unknown_routes) or "none"
+                    raise RuntimeError(f"Bot exited with code {self.bot_process.returncode} (unknown routes: {unknown})")
+                if time.monotonic() > deadline:
+                    raise RuntimeError("Bot did not become ready")
+                try:
+                    async with session.get(url) as response:
+                        if response.status == 200:
+                            return
+                except aiohttp.ClientError:
+                    pass  # Web server not up yet
+                await asyncio.sleep(0.2)
+
+    # --- Clicks ---
+
+    async def click_all(self, clicks):
+        """Sends (custom_id, user ID, channel ID, message) clicks at --rate per minute and waits for the acks."""
+        interval = 60.0 / self.args.rate
+        start = time.perf_counter()
+        pending = []
+        for i, (custom_id, user_id, channel_id, message) in enumerate(clicks):
+            delay = start + i * interval - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            acked = await self.mock.click(custom_id, user_id, channel_id, message)
+            pending.append((custom_id, acked))
+
+        for custom_id, acked in pending:
+            try:
+                seconds = await asyncio.wait_for(acked, timeout=self.args.timeout)
+            except asyncio.TimeoutError:
+                seconds = None
+            self.results.setdefault(custom_id, []).append(seconds)
+        return time.perf_counter() - start
+
+    def ticket_channels(self):
+        """Returns (channel ID, owner ID) of every ticket channel the bot created."""
+        tickets = []
+        for channel in list(self.mock.channels.values()):
+            match = re.search(r"\(ID: (\d+)\)", channel.get("topic") or "")
+            if channel["name"].startswith("ticket-") and match:
+                tickets.append((channel["id"], match.group(1)))
+        return tickets
+
+    async def scenario_tickets(self):
+        """Every click comes from a different member and opens a new ticket."""
+        panel = self.mock.post_panel(self.ticket_custom_ids)
+        staff_ids = set(self.mock.staff_role_ids)
+        users = [user_id for user_id, member in self.mock.members.items()
+                 if user_id != self.mock.bot_user["id"] and not staff_ids.intersection(member["roles"])]
+        random.shuffle(users)
+        clicks = [(self.ticket_custom_ids[i % len(self.ticket_custom_ids)], users[i], self.mock.panel_channel["id"], panel)
+                  for i in range(min(self.args.clicks, len(users)))]
+        seconds = await self.click_all(clicks)
+        await self.wait_for_tickets(len(clicks))
+        return seconds
+
+    async def wait_for_tickets(self, count):
+        """Channel creations are rate limited, so the queued tickets keep coming after the last ack."""
+        deadline = time.monotonic() + self.args.timeout
+        while time.monotonic() < deadline:
+            ready = sum(1 for channel_id, _ in self.ticket_channels()
+                        if self.mock.message_with_button(channel_id, "close_ticket") is not None)
+            if ready >= count:
+                return
+            await asyncio.sleep(0.5)
+
+    async def scenario_close(self):
+        """Every ticket owner closes their ticket."""
+        clicks = []
+        for channel_id, owner_id in self.ticket_channels():
+            message = self.mock.message_with_button(channel_id, "close_ticket")
+            if message is not None:
+                clicks.append(("close_ticket", owner_id, channel_id, message))
+        return await self.click_all(clicks)
+
+    async def scenario_delete(self):
+        """Staff deletes every closed ticket."""
+        staff_ids = set(self.mock.staff_role_ids)
+        staff = [user_id for user_id, member in self.mock.members.items() if staff_ids.intersection(member["roles"])]
+        clicks = []
+        for channel_id, _ in self.ticket_channels():
+            message = self.mock.message_with_button(channel_id, "delete_closed_ticket")
+            if message is not None:
+                clicks.append(("delete_closed_ticket", random.choice(staff), channel_id, message))
+        return await self.click_all(clicks)
+
+    # --- Report ---
+
+    def report(self, durations):
+        print()
+        print(f"{'custom_id':<22} {'clicks':>7} {'acked':>7} {'>3s':>5} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+        for custom_id, values in self.results.items():
+            acked = [value for value in values if value is not None]
+            late = sum(1 for value in values if value is None or value > ACK_DEADLINE)
+            if acked:
+                p50, p99, worst = (percentile(acked, 50) * 1000, percentile(acked, 99) * 1000, max(acked) * 1000)
+                print(f"{custom_id:<22} {len(values):>7} {len(acked):>7} {late:>5} {p50:>8.1f} {p99:>8.1f} {worst:>8.1f}")
+            else:
+                print(f"{custom_id:<22} {len(values):>7} {0:>7} {late:>5} {'-':>8} {'-':>8} {'-':>8}")
+        print()
+        for scenario, (count, seconds) in durations.items():
+            print(f"{scenario}: {count} clicks in {seconds:.1f}s ({count / seconds:.1f}/s)" if seconds else f"{scenario}: no clicks")
+        print(f"Tickets open at the end: {len(self.ticket_channels())}")
+        if self.mock.rate_limited:
+            print("429 responses: " + ", ".join(f"{route} x{count}" for route, count in self.mock.rate_limited.items()))
+        if self.mock.unknown_routes:
+            print("Unknown routes: " + ", ".join(f"{route} x{count}" for route, count in self.mock.unknown_routes.items()))
+
+    async def run(self):
+        await self.mock.start(port=self.args.port)
+        with tempfile.TemporaryDirectory(prefix="ticket-load-") as tmp:
+            self.start_bot(tmp)
+            try:
+                await self.wait_for_bot()
+                print(f"Bot connected, guild with {len(self.mock.members)} members")
+
+                durations = {}
+                for scenario in self.args.scenarios.split(","):
+                    before = sum(len(values) for values in self.results.values())
+                    seconds = await getattr(self, f"scenario_{scenario}")()
+                    durations[scenario] = (sum(len(values) for values in self.results.values()) - before, seconds)
+                    # Let the bot finish the follow-up work (welcome messages, overwrites, deletions)
+                    await asyncio.sleep(self.args.settle)
+                self.report(durations)
+            finally:
+                self.stop_bot()
+                await self.mock.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end load test of the bot against a mock Discord.")
+    parser.add_argument("--clicks", type=int, default=1000, help="ticket clicks in the tickets scenario")
+    parser.add_argument("--rate", type=float, default=1000, help="clicks per minute")
+    parser.add_argument("--members", type=int, default=5000)
+    parser.add_argument("--scenarios", default="tickets,close,delete", help="comma-separated: tickets, close, delete")
+    parser.add_argument("--channel-create-limit", type=int, help="channel creations per 5s per guild (0 = unlimited)")
+    parser.add_argument("--global-limit", type=int, default=50, help="requests per second over all routes (0 = unlimited)")
+    parser.add_argument("--timeout", type=float, default=30, help="seconds to wait for an acknowledgement")
+    parser.add_argument("--settle", type=float, default=10, help="seconds to wait after each scenario")
+    parser.add_argument("--port", type=int, default=8765, help="mock Discord port (the bot's web server gets port + 1)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--bot-log-level", default="WARNING")
+    args = parser.parse_args()
+    random.seed(args.seed)
+    asyncio.run(LoadTest(args).run())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,506 @@
+"""A local stand-in for the Discord REST API and gateway, for end-to-end load tests.
+
+The real bot connects to it when started with
+
+    DISCORD_API_BASE_URL=http://127.0.0.1:<port>/api/v10
+    DISCORD_GATEWAY_URL=ws://127.0.0.1:<port>/gateway
+
+It serves one fake guild over the gateway (READY, GUILD_CREATE, member chunks) and
+implements the REST routes the ticket system uses, keeping channels and messages in
+memory and sending the matching gateway events. Routes are rate limited per bucket like
+Discord (X-RateLimit-* headers, 429 with retry_after), and interaction callbacks are
+timestamped so a load driver can measure time-to-acknowledge (see load_test.py).
+
+    python bench/mock_discord.py --port 8765    # serve without a driver, e.g. for manual tests
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import re
+import time
+from datetime import datetime, timezone
+
+import aiohttp
+import aiohttp.web
+
+log = logging.getLogger("mock_discord")
+
+API_PREFIX = "/api/v10"
+
+# Channel types used by the bot
+TEXT_CHANNEL = 0
+CATEGORY_CHANNEL = 4
+
+# Interaction callback types (https://discord.com/developers/docs/interactions/receiving-and-responding)
+CHANNEL_MESSAGE_WITH_SOURCE = 4
+DEFERRED_CHANNEL_MESSAGE_WITH_SOURCE = 5
+
+# Permission bits: administrator, and everything a ticket staff member needs
+ADMINISTRATOR = 1 << 3
+ALL_PERMISSIONS = (1 << 53) - 1
+
+# (method, route template) -> (requests, per seconds). Buckets are per major parameter
+# (guild or channel ID) like Discord's. Discord does not publish exact limits, these are
+# in the range observed for bots.
+DEFAULT_LIMITS = {
+    ("POST", "/guilds/{guild_id}/channels"): (5, 5.0),
+    ("PATCH", "/channels/{channel_id}"): (5, 5.0),
+    ("DELETE", "/channels/{channel_id}"): (5, 5.0),
+    ("POST", "/channels/{channel_id}/messages"): (5, 5.0),
+    ("DELETE", "/channels/{channel_id}/messages/{message_id}"): (5, 1.0),
+    ("POST", "/channels/{channel_id}/messages/bulk-delete"): (1, 1.0),
+    ("GET", "/channels/{channel_id}/messages"): (5, 5.0),
+}
+
+# Requests per second over all routes (Discord's global limit)
+DEFAULT_GLOBAL_LIMIT = 50
+
+_snowflakes = itertools.count(int((time.time() * 1000 - 1420070400000)) << 22)
+
+def snowflake():
+    return str(next(_snowflakes))
+
+def iso_now():
+    return datetime.now(timezone.utc).isoformat()
+
+def json_response(data, status=200, headers=None):
+    # discord.py only parses bodies whose content type is exactly "application/json" (no charset)
+    return aiohttp.web.Response(body=json.dumps(data).encode(), status=status, headers=headers,
+                                content_type="application/json")
+
+class Bucket:
+    """Fixed-window rate limit bucket."""
+
+    def __init__(self, name, limit, per):
+        self.name = name
+        self.limit = limit
+        self.per = per
+        self.remaining = limit
+        self.reset_at = 0.0
+
+    def hit(self):
+        """Takes one request from the bucket. Returns the seconds to wait if it is empty, else 0."""
+        now = time.time()
+        if now >= self.reset_at:
+            self.remaining = self.limit
+            self.reset_at = now + self.per
+        if self.remaining <= 0:
+            return self.reset_at - now
+        self.remaining -= 1
+        return 0.0
+
+    def headers(self):
+        return {
+            "X-RateLimit-Limit": str(self.limit),
+            "X-RateLimit-Remaining": str(self.remaining),
+            "X-RateLimit-Reset": f"{self.reset_at:.3f}",
+            "X-RateLimit-Reset-After": f"{max(0.0, self.reset_at - time.time()):.3f}",
+            "X-RateLimit-Bucket": self.name,
+        }
+
+class MockDiscord:
+    """In-memory Discord: one guild, its channels and messages, the gateway and the REST routes."""
+
+    def __init__(self, members=1000, staff_roles=("Admin",), staff_share=0.02, limits=None,
+                 global_limit=DEFAULT_GLOBAL_LIMIT):
+        self.limits = dict(DEFAULT_LIMITS if limits is None else limits)
+        self.global_bucket = Bucket("global", global_limit, 1.0) if global_limit else None
+        self._buckets = {}
+        self._handler_table = self._handlers()
+        self._routes = [(method, template, re.compile("^" + re.sub(r"\{(\w+)\}", r"(?P<\1>[^/]+)", template) + "$"))
+                        for method, template in self._handler_table]
+
+        self.application_id = snowflake()
+        self.bot_user = self._user("Ticket Bot", bot=True, user_id=self.application_id)
+        self.guild_id = snowflake()
+        self.roles = {self.guild_id: self._role("@everyone", self.guild_id, permissions=0)}
+        self.staff_role_ids = []
+        for name in staff_roles:
+            role = self._role(name, snowflake(), permissions=ADMINISTRATOR if name in ("OWNER", "Admin") else 0)
+            self.roles[role["id"]] = role
+            self.staff_role_ids.append(role["id"])
+
+        self.members = {}
+        self._add_member(self.bot_user, [])
+        staff_every = max(1, int(1 / staff_share)) if staff_share else 0
+        for i in range(members):
+            roles = [self.staff_role_ids[i % len(self.staff_role_ids)]] if staff_every and i % staff_every == 0 else []
+            self._add_member(self._user(f"member-{i}"), roles)
+
+        self.channels = {}
+        # channel ID -> list of message payloads (oldest first)
+        self.messages = {}
+        self.panel_channel = self._create_channel({"name": "tickets", "type": TEXT_CHANNEL})
+
+        self._sockets = []
+        self._sequence = itertools.count(1)
+        self.ready = asyncio.Event()
+
+        # interaction ID -> (custom_id, dispatched at, future resolved with the ack time, channel ID)
+        self._interactions = {}
+        # interaction token -> the public response message (edited by PATCH .../messages/@original)
+        self._original_messages = {}
+        # interaction token -> channel ID (follow-up messages belong to the interaction's channel)
+        self._interaction_channels = {}
+        # Counters for the report
+        self.requests = {}
+        self.rate_limited = {}
+        self.unknown_routes = {}
+
+    # --- Payload builders ---
+
+    def _user(self, name, bot=False, user_id=None):
+        return {"id": user_id or snowflake(), "username": name, "discriminator": "0", "global_name": name,
+                "avatar": None, "bot": bot, "public_flags": 0}
+
+    def _role(self, name, role_id, permissions=0):
+        return {"id": role_id, "name": name, "color": 0, "hoist": False, "position": len(getattr(self, "roles", {})),
+                "permissions": str(permissions), "managed": False, "mentionable": True, "flags": 0}
+
+    def _add_member(self, user, roles):
+        self.members[user["id"]] = {"user": user, "roles": roles, "joined_at": iso_now(), "deaf": False,
+                                    "mute": False, "flags": 0, "nick": None}
+
+    def member_payload(self, user_id):
+        member = dict(self.members[user_id])
+        administrator = any(int(self.roles[role_id]["permissions"]) & ADMINISTRATOR for role_id in member["roles"])
+        member["permissions"] = str(ALL_PERMISSIONS if administrator else 0)
+        return member
+
+    def guild_payload(self):
+        return {
+            "id": self.guild_id, "name": "Load Test Guild", "icon": None, "owner_id": self.bot_user["id"],
+            "roles": list(self.roles.values()), "emojis": [], "stickers": [], "features": [],
+            "channels": list(self.channels.values()), "members": [self.members[self.bot_user["id"]]],
+            "member_count": len(self.members), "large": len(self.members) > 250, "threads": [],
+            "voice_states": [], "presences": [], "stage_instances": [], "guild_scheduled_events": [],
+            "afk_timeout": 300, "verification_level": 0, "default_message_notifications": 0,
+            "explicit_content_filter": 0, "mfa_level": 0, "premium_tier": 0, "system_channel_flags": 0,
+            "preferred_locale": "de", "nsfw_level": 0, "unavailable": False, "joined_at": iso_now(),
+        }
+
+    def _create_channel(self, body):
+        channel = {
+            "id": snowflake(), "guild_id": self.guild_id, "type": body.get("type", TEXT_CHANNEL),
+            "name": body["name"], "position": len(self.channels), "parent_id": body.get("parent_id"),
+            "topic": body.get("topic"), "nsfw": False, "last_message_id": None, "rate_limit_per_user": 0,
+            "permission_overwrites": body.get("permission_overwrites", []), "flags": 0,
+        }
+        self.channels[channel["id"]] = channel
+        self.messages[channel["id"]] = []
+        return channel
+
+    def _create_message(self, channel_id, body, author=None, store=True):
+        message = {
+            "id": snowflake(), "channel_id": channel_id, "guild_id": self.guild_id,
+            "author": author or self.bot_user, "content": body.get("content") or "", "timestamp": iso_now(),
+            "edited_timestamp": None, "tts": False, "mention_everyone": False, "mentions": [],
+            "mention_roles": [], "attachments": [], "embeds": body.get("embeds") or [],
+            "components": body.get("components") or [], "pinned": False, "type": 0, "flags": body.get("flags", 0),
+        }
+        if store and channel_id in self.messages:
+            self.messages[channel_id].append(message)
+            self.channels[channel_id]["last_message_id"] = message["id"]
+        return message
+
+    def post_panel(self, custom_ids):
+        """Posts the ticket panel message (the one the ticket buttons are clicked on)."""
+        buttons = [{"type": 2, "style": 1, "label": custom_id, "custom_id": custom_id} for custom_id in custom_ids]
+        rows = [{"type": 1, "components": buttons[i:i + 5]} for i in range(0, len(buttons), 5)]
+        return self._create_message(self.panel_channel["id"], {"content": "", "components": rows})
+
+    def message_with_button(self, channel_id, custom_id):
+        """Returns the newest message of a channel that has the button, or None."""
+        for message in reversed(self.messages.get(channel_id, [])):
+            for row in message["components"]:
+                if any(component.get("custom_id") == custom_id for component in row.get("components", [])):
+                    return message
+        return None
+
+    # --- Gateway ---
+
+    async def dispatch(self, event, data):
+        payload = json.dumps({"op": 0, "t": event, "s": next(self._sequence), "d": data})
+        for socket in list(self._sockets):
+            try:
+                await socket.send_str(payload)
+            except ConnectionError:
+                pass
+
+    async def _gateway(self, request):
+        socket = aiohttp.web.WebSocketResponse(max_msg_size=0)
+        await socket.prepare(request)
+        self._sockets.append(socket)
+        await socket.send_json({"op": 10, "d": {"heartbeat_interval": 41250}})
+        try:
+            async for msg in socket:
+                if msg.type != aiohttp.WSMsgType.TEXT:
+                    continue
+                payload = json.loads(msg.data)
+                op = payload["op"]
+                if op == 1:  # Heartbeat
+                    await socket.send_json({"op": 11})
+                elif op == 2:  # Identify
+                    await self._identify(socket, payload["d"])
+                elif op == 3:  # Presence update - nothing to simulate
+                    pass
+                elif op == 6:  # Resume - not supported, make the client identify again
+                    await socket.send_json({"op": 9, "d": False})
+                elif op == 8:  # Request guild members
+                    await self._send_member_chunks(payload["d"])
+        finally:
+            self._sockets.remove(socket)
+        return socket
+
+    async def _identify(self, socket, data):
+        shard = data.get("shard", [0, 1])
+        await self.dispatch("READY", {
+            "v": 10, "user": self.bot_user, "guilds": [{"id": self.guild_id, "unavailable": True}],
+            "session_id": snowflake(), "resume_gateway_url": str(self.gateway_url), "shard": shard,
+            "application": {"id": self.application_id, "flags": 0},
+        })
+        await self.dispatch("GUILD_CREATE", self.guild_payload())
+        self.ready.set()
+
+    async def _send_member_chunks(self, data, chunk_size=1000):
+        members = list(self.members.values())
+        chunks = [members[i:i + chunk_size] for i in range(0, len(members), chunk_size)] or [[]]
+        for index, chunk in enumerate(chunks):
+            await self.dispatch("GUILD_MEMBERS_CHUNK", {
+                "guild_id": self.guild_id, "members": chunk, "chunk_index": index,
+                "chunk_count": len(chunks), "nonce": data.get("nonce"),
+            })
+
+    # --- Interactions ---
+
+    async def click(self, custom_id, user_id, channel_id, message):
+        """Sends a button click to the bot and returns a future that resolves to the seconds until it was acknowledged."""
+        interaction_id = snowflake()
+        token = f"token-{interaction_id}"
+        acked = asyncio.get_running_loop().create_future()
+        self._interactions[interaction_id] = (custom_id, time.perf_counter(), acked, channel_id)
+        self._interaction_channels[token] = channel_id
+        channel = self.channels[channel_id]
+        await self.dispatch("INTERACTION_CREATE", {
+            "id": interaction_id, "application_id": self.application_id, "type": 3, "token": token,
+            "version": 1, "guild_id": self.guild_id, "channel_id": channel_id, "channel": channel,
+            "member": self.member_payload(user_id), "message": message,
+            "data": {"custom_id": custom_id, "component_type": 2}, "app_permissions": str(ALL_PERMISSIONS),
+            "locale": "de", "guild_locale": "de", "entitlements": [], "authorizing_integration_owners": {},
+            "context": 0, "attachment_size_limit": 10 * 1024 * 1024,
+        })
+        return acked
+
+    # --- REST ---
+
+    def _handlers(self):
+        return {
+            ("GET", "/gateway"): self._get_gateway,
+            ("GET", "/gateway/bot"): self._get_gateway,
+            ("GET", "/users/@me"): self._get_me,
+            ("GET", "/oauth2/applications/@me"): self._get_application,
+            ("POST", "/guilds/{guild_id}/channels"): self._post_channel,
+            ("PATCH", "/channels/{channel_id}"): self._patch_channel,
+            ("DELETE", "/channels/{channel_id}"): self._delete_channel,
+            ("POST", "/channels/{channel_id}/messages"): self._post_message,
+            ("GET", "/channels/{channel_id}/messages"): self._get_messages,
+            ("DELETE", "/channels/{channel_id}/messages/{message_id}"): self._delete_message,
+            ("POST", "/channels/{channel_id}/messages/bulk-delete"): self._bulk_delete,
+            ("POST", "/interactions/{interaction_id}/{token}/callback"): self._interaction_callback,
+            ("POST", "/webhooks/{application_id}/{token}"): self._webhook_message,
+            ("PATCH", "/webhooks/{application_id}/{token}/messages/{message_id}"): self._webhook_message,
+            ("POST", "/users/@me/channels"): self._dm_channel,
+        }
+
+    async def _rest(self, request):
+        path = "/" + request.match_info["path"]
+        for method, template, pattern in self._routes:
+            if method != request.method:
+                continue
+            match = pattern.match(path)
+            if match:
+                break
+        else:
+            key = f"{request.method} {path}"
+            self.unknown_routes[key] = self.unknown_routes.get(key, 0) + 1
+            return json_response({"message": "404: Not Found", "code": 0}, status=404)
+
+        route = f"{method} {template}"
+        self.requests[route] = self.requests.get(route, 0) + 1
+        params = match.groupdict()
+
+        headers = {}
+        limit = self.limits.get((method, template))
+        if limit is not None:
+            major = params.get("guild_id") or params.get("channel_id") or ""
+            key = (method, template, major)
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = Bucket(f"{method}:{template}:{major}", *limit)
+            retry_after = bucket.hit()
+            headers = bucket.headers()
+            if retry_after:
+                return self._too_many_requests(route, retry_after, headers, scope="user")
+        if self.global_bucket is not None and not template.startswith(("/interactions", "/gateway")):
+            retry_after = self.global_bucket.hit()
+            if retry_after:
+                return self._too_many_requests(route, retry_after, {"X-RateLimit-Global": "true"}, scope="global")
+
+        body = None
+        if request.can_read_body and request.content_type == "application/json":
+            body = await request.json()
+        elif request.can_read_body and request.content_type.startswith("multipart/"):
+            form = await request.post()
+            body = json.loads(form.get("payload_json", "{}"))
+        status, data = await self._handler_table[(method, template)](request, params, body or {})
+        if data is None:
+            return aiohttp.web.Response(status=status, headers=headers)
+        return json_response(data, status=status, headers=headers)
+
+    def _too_many_requests(self, route, retry_after, headers, scope):
+        self.rate_limited[route] = self.rate_limited.get(route, 0) + 1
+        headers = dict(headers, **{"Retry-After": f"{retry_after:.3f}", "X-RateLimit-Scope": scope,
+                                   "Via": "1.1 google"})
+        return json_response(
+            {"message": "You are being rate limited.", "retry_after": round(retry_after, 3), "global": scope == "global"},
+            status=429, headers=headers,
+        )
+
+    async def _get_gateway(self, request, params, body):
+        return 200, {"url": str(self.gateway_url), "shards": 1,
+                     "session_start_limit": {"total": 1000, "remaining": 1000, "reset_after": 0, "max_concurrency": 1}}
+
+    async def _get_me(self, request, params, body):
+        return 200, self.bot_user
+
+    async def _get_application(self, request, params, body):
+        return 200, {"id": self.application_id, "name": self.bot_user["username"], "icon": None, "description": "",
+                     "bot_public": True, "bot_require_code_grant": False, "owner": self.bot_user,
+                     "verify_key": "", "flags": 0, "team": None, "summary": ""}
+
+    async def _post_channel(self, request, params, body):
+        channel = self._create_channel(body)
+        await self.dispatch("CHANNEL_CREATE", channel)
+        return 201, channel
+
+    async def _patch_channel(self, request, params, body):
+        channel = self.channels.get(params["channel_id"])
+        if channel is None:
+            return 404, {"message": "Unknown Channel", "code": 10003}
+        channel.update({key: value for key, value in body.items() if key in channel})
+        await self.dispatch("CHANNEL_UPDATE", channel)
+        return 200, channel
+
+    async def _delete_channel(self, request, params, body):
+        channel = self.channels.pop(params["channel_id"], None)
+        self.messages.pop(params["channel_id"], None)
+        if channel is None:
+            return 404, {"message": "Unknown Channel", "code": 10003}
+        await self.dispatch("CHANNEL_DELETE", channel)
+        return 200, channel
+
+    async def _post_message(self, request, params, body):
+        if params["channel_id"] not in self.channels:
+            return 404, {"message": "Unknown Channel", "code": 10003}
+        message = self._create_message(params["channel_id"], body)
+        await self.dispatch("MESSAGE_CREATE", message)
+        return 200, message
+
+    async def _get_messages(self, request, params, body):
+        messages = self.messages.get(params["channel_id"], [])
+        limit = int(request.query.get("limit", 50))
+        after = int(request.query.get("after", 0))
+        # Like Discord: the page after `after`, newest message first
+        page = [message for message in messages if int(message["id"]) > after][:limit]
+        return 200, list(reversed(page))
+
+    async def _delete_message(self, request, params, body):
+        messages = self.messages.get(params["channel_id"], [])
+        self.messages[params["channel_id"]] = [m for m in messages if m["id"] != params["message_id"]]
+        return 204, None
+
+    async def _bulk_delete(self, request, params, body):
+        ids = set(body.get("messages", []))
+        messages = self.messages.get(params["channel_id"], [])
+        self.messages[params["channel_id"]] = [m for m in messages if m["id"] not in ids]
+        return 204, None
+
+    async def _interaction_callback(self, request, params, body):
+        acked_at = time.perf_counter()
+        entry = self._interactions.pop(params["interaction_id"], None)
+        if entry is None:
+            return 404, {"message": "Unknown interaction", "code": 10062}
+        _, dispatched_at, acked, channel_id = entry
+        if not acked.done():
+            acked.set_result(acked_at - dispatched_at)
+
+        callback_type = body.get("type")
+        data = body.get("data") or {}
+        response = {"interaction": {
+            "id": params["interaction_id"], "type": 3,
+            "response_message_loading": callback_type == DEFERRED_CHANNEL_MESSAGE_WITH_SOURCE,
+            "response_message_ephemeral": bool(data.get("flags", 0) & 64),
+        }}
+        if callback_type == CHANNEL_MESSAGE_WITH_SOURCE:
+            # Public responses are messages in the channel (the close button's reply carries the delete button)
+            ephemeral = response["interaction"]["response_message_ephemeral"]
+            message = self._create_message(channel_id, data, store=not ephemeral)
+            self._original_messages[params["token"]] = message
+            response["resource"] = {"type": callback_type, "message": message}
+        return 200, response
+
+    async def _webhook_message(self, request, params, body):
+        original = self._original_messages.get(params["token"])
+        if params.get("message_id") == "@original" and original is not None:
+            original.update({key: body[key] for key in ("content", "embeds", "components") if key in body})
+            original["edited_timestamp"] = iso_now()
+            return 200, original
+        # Follow-ups - the bot only sends ephemeral ones, so they are not stored in the channel
+        return 200, self._create_message(self._interaction_channels.get(params["token"]), body, store=False)
+
+    async def _dm_channel(self, request, params, body):
+        return 200, {"id": snowflake(), "type": 1, "recipients": [self.members[body["recipient_id"]]["user"]],
+                     "last_message_id": None}
+
+    # --- Server ---
+
+    async def start(self, host="127.0.0.1", port=8765):
+        app = aiohttp.web.Application(client_max_size=16 * 1024 * 1024)
+        app.add_routes([
+            aiohttp.web.get("/gateway", self._gateway),
+            aiohttp.web.route("*", API_PREFIX + "/{path:.*}", self._rest),
+        ])
+        self._runner = aiohttp.web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await aiohttp.web.TCPSite(self._runner, host, port).start()
+        self.api_url = f"http://{host}:{port}{API_PREFIX}"
+        self.gateway_url = f"ws://{host}:{port}/gateway"
+        log.info("Mock Discord listening on %s (gateway %s)", self.api_url, self.gateway_url)
+
+    async def stop(self):
+        for socket in list(self._sockets):
+            await socket.close()
+        await self._runner.cleanup()
+
+async def _serve(args):
+    mock = MockDiscord(members=args.members)
+    await mock.start(port=args.port)
+    print(f"DISCORD_API_BASE_URL={mock.api_url}")
+    print(f"DISCORD_GATEWAY_URL={mock.gateway_url}")
+    await asyncio.Event().wait()
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Discord REST API and gateway.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--members", type=int, default=1000)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
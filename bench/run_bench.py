@@ -0,0 +1,231 @@
+"""Offline benchmarks for the ticket and command hot paths.
+
+    python bench/run_bench.py                      # compare against bench/baseline.json
+    python bench/run_bench.py --update-baseline    # store the current results as the new baseline
+    python bench/run_bench.py --channels 1000 --members 10000
+
+Everything runs against the fake guild in bench/fakes.py - no token and no network. The
+run exits with status 1 when a benchmark got slower than its baseline by more than
+--tolerance. Timings depend on the machine, so refresh the baseline on the machine that
+runs the check.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Keep the bot's files out of the working tree and its logging out of the timings
+_tmp = tempfile.mkdtemp(prefix="ticket-bench-")
+os.environ.setdefault("TICKET_DB_FILE", os.path.join(_tmp, "tickets.db"))
+os.environ.setdefault("DELETION_QUEUE_FILE", os.path.join(_tmp, "pending_deletions.json"))
+os.environ.setdefault("TRANSCRIPTS", "0")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.chdir(ROOT)
+
+import discord
+
+import app
+import bot
+import tickets
+from fakes import FakeGuild, FakeInteraction, FakeMessage, FakeTextChannel
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+class BenchContext:
+    """The fake guild plus the members and ticket channels the benchmarks pick from."""
+
+    def __init__(self, channels, members, open_tickets):
+        self.guild = FakeGuild(channels, members, sorted(bot.guild_configs.default.staff_role_names))
+        all_members = self.guild.members[1:]  # Without the bot itself
+        staff_ids = bot.get_staff_role_ids(self.guild)
+        self.staff = [member for member in all_members if any(role.id in staff_ids for role in member.roles)]
+        staff_member_ids = {member.id for member in self.staff}
+        regular = [member for member in all_members if member.id not in staff_member_ids]
+
+        self.owners = regular[:open_tickets]
+        self.without_ticket = regular[open_tickets:]
+        self.ticket_channels = []
+        for owner in self.owners:
+            overwrites = {
+                self.guild.default_role: discord.PermissionOverwrite(read_messages=False),
+                owner: discord.PermissionOverwrite(read_messages=True, send_messages=True),
+                self.guild.me: discord.PermissionOverwrite(read_messages=True, send_messages=True),
+            }
+            channel = self.guild.add_channel(FakeTextChannel(
+                self.guild, f"ticket-general-support-{owner.name}",
+                topic=f"Support Ticket für {owner.display_name} (ID: {owner.id}) - general-support",
+                overwrites=overwrites,
+            ))
+            bot.ticket_store.open_ticket(self.guild.id, channel.id, owner.id, "general-support")
+            self.ticket_channels.append((channel, owner))
+        self._fresh = iter(self.without_ticket)
+
+        # Persistent views are created once and reused for every click, like in the bot
+        self.close_view = tickets.TicketCloseView()
+        self.delete_only_view = tickets.TicketDeleteOnlyView()
+
+    def ticket(self):
+        return random.choice(self.ticket_channels)
+
+    def fresh_member(self):
+        """A member who has never opened a ticket (so creations never hit the duplicate check)."""
+        return next(self._fresh)
+
+# --- Benchmarks (each call is one operation) ---
+
+async def bench_has_any_existing_ticket(ctx):
+    _, owner = ctx.ticket()
+    await bot.has_any_existing_ticket(ctx.guild, owner)
+    await bot.has_any_existing_ticket(ctx.guild, random.choice(ctx.without_ticket))
+
+async def bench_has_existing_ticket(ctx):
+    _, owner = ctx.ticket()
+    await bot.has_existing_ticket(ctx.guild, owner, "general-support")
+    await bot.has_existing_ticket(ctx.guild, random.choice(ctx.without_ticket), "general-support")
+
+async def bench_create_ticket_channel(ctx):
+    await tickets.create_ticket_channel(ctx.guild, ctx.fresh_member(), "general-support", bot.TICKET_TYPES["general"].support_roles)
+
+async def bench_close_button_denied(ctx):
+    channel, _ = ctx.ticket()
+    await ctx.close_view.close_ticket.callback(FakeInteraction(ctx.guild, random.choice(ctx.without_ticket), channel))
+
+async def bench_close_button_owner(ctx):
+    channel, owner = ctx.ticket()
+    await ctx.close_view.close_ticket.callback(FakeInteraction(ctx.guild, owner, channel))
+
+async def bench_delete_button_owner_denied(ctx):
+    channel, owner = ctx.ticket()
+    await ctx.close_view.delete_ticket.callback(FakeInteraction(ctx.guild, owner, channel))
+
+async def bench_delete_button_staff(ctx):
+    channel, _ = ctx.ticket()
+    await ctx.delete_only_view.delete_ticket.callback(FakeInteraction(ctx.guild, random.choice(ctx.staff), channel))
+
+async def bench_on_message_chat(ctx):
+    channel, owner = ctx.ticket()
+    await app.on_message(FakeMessage(owner, channel, "Hallo, ich habe ein Problem mit meinem Account"))
+
+async def bench_on_message_command(ctx):
+    channel, _ = ctx.ticket()
+    # A different author every time, so the !ping cooldown never short-circuits the dispatch
+    await app.on_message(FakeMessage(ctx.fresh_member(), channel, "!ping"))
+
+BENCHMARKS = [
+    bench_has_any_existing_ticket,
+    bench_has_existing_ticket,
+    bench_create_ticket_channel,
+    bench_close_button_denied,
+    bench_close_button_owner,
+    bench_delete_button_owner_denied,
+    bench_delete_button_staff,
+    bench_on_message_chat,
+    bench_on_message_command,
+]
+
+# --- Runner ---
+
+async def run_benchmark(benchmark, ctx, iterations, rounds):
+    """Returns the best time per operation in microseconds over `rounds` rounds."""
+    # One untimed round first, so the role cache and staff decisions are warm like in a running bot
+    for _ in range(min(iterations, 200)):
+        await benchmark(ctx)
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            await benchmark(ctx)
+        best = min(best, (time.perf_counter() - start) / iterations)
+    return best * 1e6
+
+async def run_all(args):
+    random.seed(args.seed)
+    start = time.perf_counter()
+    ctx = BenchContext(args.channels, args.members, args.tickets)
+    print(f"Fake guild: {args.channels} channels, {args.members} members, {args.tickets} open tickets "
+          f"({time.perf_counter() - start:.1f}s to build)")
+
+    results = {}
+    for benchmark in BENCHMARKS:
+        if args.only and args.only not in benchmark.__name__:
+            continue
+        name = benchmark.__name__.removeprefix("bench_")
+        results[name] = await run_benchmark(benchmark, ctx, args.iterations, args.rounds)
+    return results
+
+def compare(results, baseline, tolerance):
+    """Prints every result next to its baseline and returns the names of the regressions."""
+    regressions = []
+    print(f"{'benchmark':<28} {'us/op':>10} {'baseline':>10} {'change':>8}")
+    for name, value in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:<28} {value:>10.2f} {'-':>10} {'new':>8}")
+            continue
+        change = value / base - 1
+        flag = ""
+        if change > tolerance:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<28} {value:>10.2f} {base:>10.2f} {change:>+7.0%}{flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the ticket and command hot paths.")
+    parser.add_argument("--channels", type=int, default=10_000)
+    parser.add_argument("--members", type=int, default=100_000)
+    parser.add_argument("--tickets", type=int, default=2_000, help="open tickets in the fake guild")
+    parser.add_argument("--iterations", type=int, default=2_000, help="operations per round")
+    parser.add_argument("--rounds", type=int, default=5, help="rounds per benchmark (the best one counts)")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed slowdown, 0.5 = 50%%")
+    parser.add_argument("--only", help="run only benchmarks whose name contains this")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--update-baseline", action="store_true", help="store the results as the new baseline")
+    args = parser.parse_args()
+
+    # Every fresh member is used once per creation / command, so make sure there are enough
+    needed = args.tickets + 2 * (args.iterations * args.rounds + 200)
+    if args.members < needed:
+        parser.error(f"--members must be at least {needed} for these settings")
+
+    results = asyncio.run(run_all(args))
+
+    scale = {"channels": args.channels, "members": args.members, "tickets": args.tickets}
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(dict(scale, results={name: round(value, 3) for name, value in results.items()}), f, indent=2)
+            f.write("\n")
+        compare(results, {}, args.tolerance)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    try:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        compare(results, {}, args.tolerance)
+        print(f"No baseline at {args.baseline} - run with --update-baseline to create one")
+        return 0
+
+    if any(baseline.get(key) != value for key, value in scale.items()):
+        print("Baseline was recorded at a different scale, not comparing")
+        compare(results, {}, args.tolerance)
+        return 0
+
+    regressions = compare(results, baseline["results"], args.tolerance)
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) regressed by more than {args.tolerance:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,476 @@
+import discord
+import os
+from dotenv import load_dotenv
+import asyncio
+import re
+import math
+import json
+import sys
+import resource
+import logging
+import aiohttp
+import yarl
+
+from bot_logging import setup_logging
+from metrics import Counter, Gauge, Histogram
+from admission_queue import AdmissionQueue
+from category_pool import CategoryPool
+from deletion_scheduler import DeletionScheduler
+from guild_config import GuildConfigRegistry
+from idle_sweeper import IdleTicketSweeper
+from profiler import HandlerProfiler
+from sharding import parse_shard_ids
+from startup_timing import startup_timer
+from ticket_stats import TicketStats
+from ticket_store import TicketStore
+from ticket_types import load_ticket_types
+
+# Core of the bot: the client, configuration and all caches. This module is never reloaded,
+# so everything in here survives a hot reload of the ticket and command modules (!reload).
+
+startup_timer.mark("imports")
+
+# Load environment variables from .env file
+load_dotenv()
+startup_timer.mark("load_dotenv")
+
+# Send all logging through the background writer (see bot_logging.py for the LOG_* settings)
+setup_logging()
+log = logging.getLogger("bot")
+ticket_log = logging.getLogger("bot.tickets")
+permission_log = logging.getLogger("bot.permissions")
+
+# Define Discord Intents
+intents = discord.Intents.default()
+intents.message_content = True
+intents.members = True
+
+# Point the client at another Discord API, e.g. the mock server of the load tests (bench/mock_discord.py)
+DISCORD_API_BASE_URL = os.getenv('DISCORD_API_BASE_URL')
+DISCORD_GATEWAY_URL = os.getenv('DISCORD_GATEWAY_URL')
+if DISCORD_API_BASE_URL:
+    discord.http.Route.BASE = DISCORD_API_BASE_URL
+if DISCORD_GATEWAY_URL:
+    discord.gateway.DiscordWebSocket.DEFAULT_GATEWAY = yarl.URL(DISCORD_GATEWAY_URL)
+
+# --- Metrics (served in Prometheus format at /metrics) ---
+
+TICKET_CREATE_SECONDS = Histogram("ticket_create_seconds", "Time spent per ticket creation phase.", ["phase"])
+TICKETS_CLOSED = Counter("tickets_closed_total", "Tickets closed with the close button.")
+TICKETS_DELETED = Counter("tickets_deleted_total", "Tickets deleted with a delete button.")
+TICKETS_AUTO_CLOSED = Counter("tickets_auto_closed_total", "Tickets closed by the idle sweeper.")
+CLEAR_DELETED_MESSAGES = Counter("clear_deleted_messages_total", "Messages deleted by !clear.")
+REST_RATE_LIMITS = Counter("discord_rest_429_total", "Discord REST responses with status 429.", ["method"])
+EVENT_LOOP_LAG = Histogram("event_loop_lag_seconds", "How late the event loop woke up a 1s sleep.",
+                           buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0))
+
+TICKET_QUEUE_REJECTED = Counter("ticket_queue_rejected_total", "Ticket clicks turned away because the queue was full.")
+
+async def _count_rate_limits(session, context, params):
+    if params.response.status == 429:
+        REST_RATE_LIMITS.inc(method=params.method)
+
+# POST /guilds/<id>/channels - the route ticket channels are created on
+CHANNEL_CREATE_ROUTE = re.compile(r"/guilds/(\d+)/channels$")
+
+async def _track_channel_create_bucket(session, context, params):
+    """Pauses the ticket queue of a guild while its channel create bucket is exhausted."""
+    if params.method != "POST":
+        return
+    match = CHANNEL_CREATE_ROUTE.search(params.url.path)
+    if not match:
+        return
+    headers = params.response.headers
+    if params.response.status == 429:
+        retry_after = headers.get("Retry-After")
+        ticket_queue.pause(int(match.group(1)), float(retry_after) if retry_after else 1.0)
+    elif headers.get("X-RateLimit-Remaining") == "0" and headers.get("X-RateLimit-Reset-After"):
+        ticket_queue.pause(int(match.group(1)), float(headers["X-RateLimit-Reset-After"]))
+
+# Wall time, REST time and event loop blocking per button custom_id and !command (shown by !perf and /perf).
+# Event loop blocking is measured on every PERF_STEP_SAMPLE-th call only (0 = only for !perf profile);
+# PERF_SLOW_STEP logs a warning whenever such a call holds the event loop that long without awaiting.
+handler_profiler = HandlerProfiler(window=int(os.getenv('PERF_WINDOW', '500')),
+                                   slow_step=float(os.getenv('PERF_SLOW_STEP', '0.1')),
+                                   step_sample=int(os.getenv('PERF_STEP_SAMPLE', '20')))
+
+# Trace every REST request discord.py makes so 429s are counted even when the library retries them
+http_trace = aiohttp.TraceConfig()
+http_trace.on_request_start.append(handler_profiler.on_request_start)
+http_trace.on_request_end.append(handler_profiler.on_request_end)
+http_trace.on_request_exception.append(handler_profiler.on_request_exception)
+http_trace.on_request_end.append(_count_rate_limits)
+http_trace.on_request_end.append(_track_channel_create_bucket)
+
+# --- Member caching mode ---
+
+# LOW_MEMORY=1 skips chunking every guild's member list at startup and caches no members
+# besides the bot itself. Ticket buttons and commands already get the acting member from the
+# interaction/message payload; anything else has to fetch members when it needs them.
+LOW_MEMORY = os.getenv('LOW_MEMORY', '').lower() in ('1', 'true', 'yes')
+MEMORY_MODE = "low-memory" if LOW_MEMORY else "full"
+
+# The presence is sent with IDENTIFY, so it needs no extra gateway command after every (re)connect
+client_options = {"activity": discord.Game(name="mit Python")}
+if LOW_MEMORY:
+    client_options.update({
+        "chunk_guilds_at_startup": False,
+        "member_cache_flags": discord.MemberCacheFlags.none(),
+    })
+
+# Last measured RSS per memory mode, used to report the difference between the modes
+MEMORY_REPORT_FILE = os.getenv('MEMORY_REPORT_FILE', 'memory_report.json')
+
+def current_rss_bytes():
+    """Returns the resident set size of this process in bytes."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        # Not Linux - fall back to the peak RSS (KiB on Linux/BSD, bytes on macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+PROCESS_RSS = Gauge("process_resident_memory_bytes", "Resident memory size of the bot process.",
+                    callback=current_rss_bytes)
+
+def _update_memory_report(rss):
+    try:
+        with open(MEMORY_REPORT_FILE, encoding="utf-8") as f:
+            report = json.load(f)
+    except (OSError, ValueError):
+        report = {}
+    report[MEMORY_MODE] = rss
+    with open(MEMORY_REPORT_FILE, "w", encoding="utf-8") as f:
+        json.dump(report, f)
+    return report
+
+memory_reported = False
+
+async def report_memory_usage():
+    """Logs the RSS after startup and how it compares to the last run in the other memory mode."""
+    global memory_reported
+    if memory_reported:
+        return  # on_ready fires again after reconnects
+    memory_reported = True
+
+    rss = current_rss_bytes()
+    try:
+        report = await asyncio.to_thread(_update_memory_report, rss)
+    except OSError as e:
+        log.error("Could not update %s: %s", MEMORY_REPORT_FILE, e)
+        report = {}
+
+    other_mode = "full" if LOW_MEMORY else "low-memory"
+    message = f"RSS after startup in {MEMORY_MODE} mode: {rss / 2**20:.1f} MiB"
+    if other_mode in report:
+        difference = rss - report[other_mode]
+        message += f" ({difference / 2**20:+.1f} MiB compared to the last {other_mode} run)"
+    log.info(message)
+
+# --- Sharding ---
+
+# SHARDED=1 runs an AutoShardedClient (shard count from SHARD_COUNT or Discord's recommendation).
+# SHARD_IDS limits this process to a range of shards - set per worker by SHARD_WORKERS (see app.py).
+SHARD_COUNT = int(os.getenv('SHARD_COUNT')) if os.getenv('SHARD_COUNT') else None
+SHARD_IDS = parse_shard_ids(os.getenv('SHARD_IDS', ''))
+SHARDED = os.getenv('SHARDED', '').lower() in ('1', 'true', 'yes') or SHARD_IDS is not None
+
+if SHARDED:
+    client = discord.AutoShardedClient(intents=intents, http_trace=http_trace,
+                                       shard_count=SHARD_COUNT, shard_ids=SHARD_IDS, **client_options)
+else:
+    client = discord.Client(intents=intents, http_trace=http_trace, **client_options)
+
+def shard_status():
+    """Returns the connection state of every shard this process runs (one entry when not sharded)."""
+    def finite_or_none(latency):
+        return latency if math.isfinite(latency) else None
+
+    if not SHARDED:
+        return [{"id": client.shard_id or 0, "latency": finite_or_none(client.latency),
+                 "connected": client.is_ready() and not client.is_closed()}]
+    return [
+        {"id": shard_id, "latency": finite_or_none(shard.latency), "connected": not shard.is_closed(),
+         "ws_ratelimited": shard.is_ws_ratelimited()}
+        for shard_id, shard in sorted(client.shards.items())
+    ]
+
+GATEWAY_LATENCY = Gauge("discord_gateway_latency_seconds", "Heartbeat latency of the gateway connection.",
+                        callback=lambda: client.latency)
+
+async def monitor_event_loop_lag(interval=1.0):
+    """Records how much later than requested the event loop wakes up (blocked loop = high lag)."""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.observe(max(loop.time() - start - interval, 0.0))
+
+lag_monitor_task = None
+
+def start_event_loop_lag_monitor():
+    """Starts the lag monitor on the running loop (only once)."""
+    global lag_monitor_task
+    if lag_monitor_task is None:
+        lag_monitor_task = asyncio.create_task(monitor_event_loop_lag())
+
+# Delayed deletions of ticket channels and temporary bot messages, persisted across restarts
+deletion_scheduler = DeletionScheduler(client, os.getenv('DELETION_QUEUE_FILE', 'pending_deletions.json'))
+
+# Ticket creations wait here (per guild, in click order) for the channel create rate limit
+TICKET_QUEUE_LIMIT = int(os.getenv('TICKET_QUEUE_LIMIT', '50'))
+TICKET_QUEUE_TIMEOUT = float(os.getenv('TICKET_QUEUE_TIMEOUT', '600'))  # Interaction tokens expire after 15 minutes
+ticket_queue = AdmissionQueue(TICKET_QUEUE_LIMIT, TICKET_QUEUE_TIMEOUT)
+TICKET_QUEUE_LENGTH = Gauge("ticket_queue_length", "Ticket creations waiting in the admission queue.",
+                            callback=lambda: len(ticket_queue))
+
+# time.monotonic() at which the cooldown of (command name, user ID) ends, for the cooldowns in commands.py
+# (expired entries are swept from there)
+command_cooldowns = {}
+
+# --- Ticket Channel Management ---
+
+# Ticket types (panel buttons, welcome embeds and support roles) are configured in this file,
+# so adding a type needs no code change. Re-read in place by reload_ticket_types (!reload).
+TICKET_TYPES_FILE = os.getenv('TICKET_TYPES_FILE', 'ticket_types.json')
+TICKET_TYPES = load_ticket_types(TICKET_TYPES_FILE)
+
+# Admin roles, support roles per ticket type and ticket categories - a "default" section plus
+# one section per guild that differs (see guild_config.py). The file is checked for changes
+# every GUILD_CONFIG_WATCH_INTERVAL seconds and applied without a restart.
+GUILD_CONFIG_FILE = os.getenv('GUILD_CONFIG_FILE', 'guild_config.json')
+GUILD_CONFIG_WATCH_INTERVAL = float(os.getenv('GUILD_CONFIG_WATCH_INTERVAL', '5'))
+
+def guild_config_changed(guild_ids):
+    """Drops everything compiled from the old config of these guilds (None = all guilds)."""
+    for cache in (role_cache, staff_role_ids, staff_decisions):
+        if guild_ids is None:
+            cache.clear()
+        else:
+            for guild_id in guild_ids:
+                cache.pop(guild_id, None)
+    category_pool.invalidate(guild_ids)
+
+guild_configs = GuildConfigRegistry(GUILD_CONFIG_FILE, TICKET_TYPES)
+guild_configs.load()
+# Only from here on - the caches it drops are defined further down
+guild_configs.on_change = guild_config_changed
+
+# Channels per ticket category, counted once per guild and kept current by the channel events
+category_pool = CategoryPool(guild_configs.get)
+
+# --- Ticket Store ---
+
+# Every ticket (owner, type, channel, state, timestamps) is recorded in SQLite, so
+# duplicate checks and the close/delete buttons never depend on channel names or
+# topics, and open tickets are known again right after a restart.
+ticket_store = TicketStore(os.getenv('TICKET_DB_FILE', 'tickets.db'))
+
+# Open tickets per type, oldest open ticket and first staff response times, kept current
+# by the ticket events (served by !ticketstats and /ticketstats)
+ticket_stats = TicketStats()
+
+# Open tickets without a message for IDLE_TICKET_HOURS are closed automatically and deleted
+# IDLE_TICKET_GRACE_HOURS later (IDLE_TICKET_HOURS=0 turns the sweeper off)
+IDLE_TICKET_HOURS = float(os.getenv('IDLE_TICKET_HOURS', '72'))
+IDLE_TICKET_GRACE_HOURS = float(os.getenv('IDLE_TICKET_GRACE_HOURS', '24'))
+idle_sweeper = IdleTicketSweeper(
+    client, ticket_store,
+    idle_after=IDLE_TICKET_HOURS * 3600,
+    interval=float(os.getenv('IDLE_SWEEP_INTERVAL', '600')),
+    concurrency=int(os.getenv('IDLE_SWEEP_CONCURRENCY', '2')),
+    batch_limit=int(os.getenv('IDLE_SWEEP_BATCH', '25')),
+)
+
+# Ticket topics look like "Support Ticket für <name> (ID: <user id>) - <ticket type>"
+TICKET_TOPIC_PATTERN = re.compile(r"\(ID: (\d+)\) - ([\w-]+)$")
+
+def parse_ticket_topic(channel):
+    """Returns (owner_id, ticket_type) for a ticket channel, or None for other channels."""
+    if not isinstance(channel, discord.TextChannel) or not channel.name.startswith("ticket-"):
+        return None
+    if not channel.topic:
+        return None
+    match = TICKET_TOPIC_PATTERN.search(channel.topic)
+    if not match:
+        return None
+    return int(match.group(1)), match.group(2)
+
+def recover_tickets(guild):
+    """Reconciles the stored tickets of a guild with its channels after (re)connecting.
+
+    Tickets whose channel was deleted while the bot was offline are marked deleted.
+    Ticket channels from before the store existed are recognised by their topic and
+    recorded as open tickets.
+    """
+    for ticket in ticket_store.tickets_in_guild(guild.id):
+        if guild.get_channel(ticket.channel_id) is None:
+            ticket_store.delete_ticket(ticket.channel_id)
+
+    imported = 0
+    for channel in guild.text_channels:
+        if ticket_store.get(channel.id) is not None:
+            continue
+        parsed = parse_ticket_topic(channel)
+        if parsed:
+            owner_id, ticket_type = parsed
+            ticket_store.open_ticket(guild.id, channel.id, owner_id, ticket_type, created_at=channel.created_at.timestamp())
+            imported += 1
+    ticket_log.info("Tickets recovered for %s: %d tracked, %d imported from channel topics",
+                    guild.name, ticket_store.count_in_guild(guild.id), imported)
+
+def get_ticket_channel(guild, ticket):
+    """Returns the channel of a stored ticket, marking the ticket deleted if the channel is gone."""
+    if ticket is None:
+        return None
+    channel = guild.get_channel(ticket.channel_id)
+    if channel is None:
+        ticket_store.delete_ticket(ticket.channel_id)
+    return channel
+
+async def has_existing_ticket(guild, user, ticket_type):
+    """Checks if user already has an open ticket of this type."""
+    ticket = ticket_store.get_for_owner(guild.id, user.id)
+    if ticket is None or ticket_type.split("-")[0] not in ticket.ticket_type:
+        return None
+    return get_ticket_channel(guild, ticket)
+
+async def has_any_existing_ticket(guild, user):
+    """Checks if user already has any open ticket."""
+    channel = get_ticket_channel(guild, ticket_store.get_for_owner(guild.id, user.id))
+    if channel:
+        ticket_log.debug("Found existing ticket for %s (ID: %s): %s", user.name, user.id, channel.name)
+    return channel
+
+# --- In-flight Ticket Creations ---
+
+# (guild ID, user ID) pairs whose ticket channel is currently being created.
+# Double-clicks and retried interactions would otherwise race through the gap
+# between the duplicate check and create_ticket_channel.
+ticket_creations_in_flight = set()
+
+def claim_ticket_creation(guild, user):
+    """Marks a ticket creation as in flight. Returns False if one is already running for this user."""
+    key = (guild.id, user.id)
+    if key in ticket_creations_in_flight:
+        return False
+    ticket_creations_in_flight.add(key)
+    return True
+
+def release_ticket_creation(guild, user):
+    """Clears the in-flight marker once the ticket creation finished (or failed)."""
+    ticket_creations_in_flight.discard((guild.id, user.id))
+
+# --- Role Cache ---
+
+# Maps guild ID -> {"roles": {role name -> role}, "templates": {support role names -> (overwrites, mentions)}}.
+# Built lazily on the first ticket of a guild and dropped by the role create/update/delete events,
+# so ticket creation never scans guild.roles or rebuilds the role overwrites.
+role_cache = {}
+
+def get_role_cache(guild):
+    """Returns the role cache of a guild, building it if needed."""
+    cache = role_cache.get(guild.id)
+    if cache is None:
+        roles_by_name = {}
+        for role in guild.roles:
+            # Same as discord.utils.get: the first role with a given name wins
+            roles_by_name.setdefault(role.name, role)
+        cache = {"roles": roles_by_name, "templates": {}}
+        role_cache[guild.id] = cache
+    return cache
+
+def get_ticket_template(guild, support_role_names, config=None):
+    """Returns the prebuilt (role overwrites, role mention text) for a ticket type (in the guild's current config unless given)."""
+    # Handle both single role (string) and multiple roles (list)
+    if isinstance(support_role_names, str):
+        support_role_names = [support_role_names]
+
+    config = config or guild_configs.get(guild.id)
+    cache = get_role_cache(guild)
+    # The admin roles are part of the key, so a handler still holding the previous config
+    # never leaves a template built from it in the cache
+    key = (config.admin_roles, tuple(support_role_names))
+    template = cache["templates"].get(key)
+    if template is None:
+        roles_by_name = cache["roles"]
+        overwrites = {}
+        mentions = []
+
+        # Add admin roles (OWNER, Admin) - they always have access to all tickets and get pinged
+        for admin_role_name in config.admin_roles:
+            admin_role = roles_by_name.get(admin_role_name)
+            if admin_role:
+                overwrites[admin_role] = discord.PermissionOverwrite(read_messages=True, send_messages=True, manage_messages=True)
+                mentions.append(admin_role.mention)
+
+        # Add specific support role permissions and mentions for this ticket type
+        for role_name in support_role_names:
+            support_role = roles_by_name.get(role_name)
+            if support_role:
+                overwrites[support_role] = discord.PermissionOverwrite(read_messages=True, send_messages=True)
+                mentions.append(support_role.mention)
+
+        template = (overwrites, " ".join(mentions))
+        cache["templates"][key] = template
+    return template
+
+def invalidate_role_cache(guild):
+    """Drops the role cache of a guild so it is rebuilt on the next ticket."""
+    role_cache.pop(guild.id, None)
+
+# --- Ticket Staff Permissions ---
+
+# Role names whose members may close and delete every ticket (admins plus all pinged support roles)
+# are compiled per guild into GuildConfig.staff_role_names.
+
+# Maps guild ID -> frozenset of the IDs of all roles named in the guild's staff_role_names
+staff_role_ids = {}
+
+# Maps guild ID -> {member ID -> is ticket staff}. Dropped per member by on_member_update
+# and per guild by the role events, so the close/delete buttons are a dict lookup.
+staff_decisions = {}
+
+def get_staff_role_ids(guild):
+    """Returns the IDs of the guild's staff roles, compiled once per guild."""
+    role_ids = staff_role_ids.get(guild.id)
+    if role_ids is None:
+        staff_role_names = guild_configs.get(guild.id).staff_role_names
+        role_ids = frozenset(role.id for role in guild.roles if role.name in staff_role_names)
+        staff_role_ids[guild.id] = role_ids
+    return role_ids
+
+def is_ticket_staff(member):
+    """Checks if a member has an admin or support role (memoized per member)."""
+    guild_id = member.guild.id
+    if LOW_MEMORY:
+        # Uncached members get no on_member_update, so a memoized decision could go stale
+        return any(role.id in get_staff_role_ids(member.guild) for role in member.roles)
+    decisions = staff_decisions.setdefault(guild_id, {})
+    decision = decisions.get(member.id)
+    if decision is None:
+        role_ids = get_staff_role_ids(member.guild)
+        decision = any(role.id in role_ids for role in member.roles)
+        decisions[member.id] = decision
+    return decision
+
+def invalidate_staff_decision(member):
+    """Forgets the memoized decision of a single member (e.g. after their roles changed)."""
+    decisions = staff_decisions.get(member.guild.id)
+    if decisions:
+        decisions.pop(member.id, None)
+
+def invalidate_staff_permissions(guild):
+    """Forgets the compiled staff roles and all member decisions of a guild."""
+    staff_role_ids.pop(guild.id, None)
+    staff_decisions.pop(guild.id, None)
+
+def reload_ticket_types():
+    """Re-reads the ticket type registry and swaps it in (raises and keeps the old one on errors)."""
+    ticket_types = load_ticket_types(TICKET_TYPES_FILE)
+    # Recompiles the guild configs with the new support roles (raises if a guild overrides a removed type)
+    guild_configs.set_ticket_types(ticket_types)
+    # Update in place - the views and handlers hold a reference to this dict
+    TICKET_TYPES.clear()
+    TICKET_TYPES.update(ticket_types)
@@ -0,0 +1,76 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+
+# Attributes every LogRecord has - everything else on a record came in through extra={...}
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+_listener = None
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as one JSON object per line, including any extra={...} fields."""
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+def parse_levels(spec):
+    """Parses "bot.tickets=DEBUG,discord=WARNING" into {logger name: level}."""
+    levels = {}
+    for part in spec.split(","):
+        name, _, level = part.strip().partition("=")
+        if name and level:
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+def setup_logging():
+    """Routes all logging through a queue to a background writer thread.
+
+    Handlers only put records on the queue, so logging from the event loop never
+    blocks on stdout. Configured through the environment:
+      LOG_LEVEL        root level (default INFO)
+      LOG_LEVELS       per-subsystem levels, e.g. "bot.tickets=DEBUG,discord=WARNING"
+      LOG_FORMAT       "text" (default) or "json"
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler()
+    if os.getenv('LOG_FORMAT', 'text').lower() == 'json':
+        stream_handler.setFormatter(JsonFormatter())
+    else:
+        stream_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)-8s %(name)s: %(message)s"))
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+
+    root = logging.getLogger()
+    root.handlers[:] = [queue_handler]
+    root.setLevel(os.getenv('LOG_LEVEL', 'INFO').upper())
+    for name, level in parse_levels(os.getenv('LOG_LEVELS', '')).items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+def stop_logging():
+    """Flushes the queue and stops the background writer."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,131 @@
+import logging
+
+import discord
+
+log = logging.getLogger("bot.categories")
+
+# Discord allows at most 50 channels in one category
+CATEGORY_CHANNEL_LIMIT = 50
+
+class CategoryPool:
+    """Picks the category for a new ticket channel from a pool and adds categories when all are full.
+
+    The pool of a guild is its configured categories plus the overflow categories the bot
+    created earlier (recognised by their name). The channels in each category are counted
+    once per guild and then kept current from the channel create/delete/update events, so
+    choosing a category is a lookup instead of a scan of the guild.
+    """
+
+    def __init__(self, get_config):
+        # guild ID -> GuildConfig (category_ids, overflow_category_name, category_overflow)
+        self._get_config = get_config
+        # guild ID -> {category ID -> set of IDs of the channels in it}, in pool order
+        self._occupancy = {}
+
+    def _is_overflow_category(self, channel, config):
+        # Overflow categories are named "<overflow name> <number>"
+        prefix = f"{config.overflow_category_name} "
+        return (isinstance(channel, discord.CategoryChannel)
+                and channel.name.startswith(prefix) and channel.name[len(prefix):].isdigit())
+
+    def _in_pool(self, channel):
+        config = self._get_config(channel.guild.id)
+        return channel.id in config.category_ids or self._is_overflow_category(channel, config)
+
+    # --- Counting ---
+
+    def build(self, guild):
+        """Counts the channels of every pool category of a guild (once, e.g. in on_ready)."""
+        config = self._get_config(guild.id)
+        # An unavailable guild has no channels yet - leave the pool to be built on the next ticket
+        if not config.category_ids or guild.unavailable:
+            self._occupancy.pop(guild.id, None)
+            return
+        pool = {}
+        configured = [guild.get_channel(category_id) for category_id in config.category_ids]
+        overflow = [category for category in guild.categories if self._is_overflow_category(category, config)]
+        for category in configured + overflow:
+            if isinstance(category, discord.CategoryChannel) and category.id not in pool:
+                pool[category.id] = {channel.id for channel in category.channels}
+        self._occupancy[guild.id] = pool
+        log.info("Ticket category pool of %s: %s", guild.name,
+                 ", ".join(f"{category_id} ({len(channels)})" for category_id, channels in pool.items()) or "empty")
+
+    def forget(self, guild):
+        """Drops the counts of a guild the bot was removed from."""
+        self._occupancy.pop(guild.id, None)
+
+    def invalidate(self, guild_ids):
+        """Drops the pools of guilds whose config changed (None = all); they are rebuilt on the next ticket."""
+        if guild_ids is None:
+            self._occupancy.clear()
+        else:
+            for guild_id in guild_ids:
+                self._occupancy.pop(guild_id, None)
+
+    def channel_created(self, channel):
+        """Counts a new channel in its category (or adds a new overflow category to the pool)."""
+        pool = self._occupancy.get(channel.guild.id)
+        if pool is None:
+            return
+        if self._in_pool(channel):
+            pool.setdefault(channel.id, set())
+        elif channel.category_id in pool:
+            pool[channel.category_id].add(channel.id)
+
+    def channel_deleted(self, channel):
+        """Stops counting a deleted channel (or drops a deleted category from the pool)."""
+        pool = self._occupancy.get(channel.guild.id)
+        if pool is None:
+            return
+        if channel.id in pool:
+            del pool[channel.id]
+        elif channel.category_id in pool:
+            pool[channel.category_id].discard(channel.id)
+
+    def channel_updated(self, before, after):
+        """Moves a channel's count when it was moved to another category."""
+        if before.category_id != after.category_id:
+            self.channel_deleted(before)
+            self.channel_created(after)
+
+    # --- Choosing ---
+
+    async def get_category(self, guild):
+        """Returns the first pool category with room for another channel, creating one if all are full.
+
+        Returns None if no pool is configured. Ticket creations of a guild run one at a time
+        (see the admission queue), so two creations never race for the last free place.
+        """
+        config = self._get_config(guild.id)
+        if not config.category_ids:
+            return None
+        pool = self._occupancy.get(guild.id)
+        # Also rebuild once a configured category that was missing when counting is in the cache
+        if pool is None or any(category_id not in pool and isinstance(guild.get_channel(category_id), discord.CategoryChannel)
+                               for category_id in config.category_ids):
+            self.build(guild)
+            pool = self._occupancy.get(guild.id)
+            if pool is None:
+                return None
+
+        for category_id, channels in pool.items():
+            if len(channels) < CATEGORY_CHANNEL_LIMIT:
+                category = guild.get_channel(category_id)
+                if category is not None:
+                    return category
+
+        if not config.category_overflow:
+            log.warning("All ticket categories of %s are full", guild.name)
+            return None
+
+        name = f"{config.overflow_category_name} {len(pool) + 1}"
+        category = await guild.create_category(
+            name,
+            overwrites={guild.default_role: discord.PermissionOverwrite(read_messages=False)},
+            reason="Alle Ticket-Kategorien sind voll",
+        )
+        pool[category.id] = set()
+        log.info("Created overflow ticket category %s in %s", name, guild.name)
+        return category
+
@@ -0,0 +1,384 @@
+import discord
+import os
+import time
+import datetime
+import io
+import logging
+
+import reloader
+import tickets
+from bot import CLEAR_DELETED_MESSAGES, TICKET_TYPES, client, command_cooldowns, deletion_scheduler, handler_profiler, ticket_stats
+
+# The !commands handled in on_message. Reloaded in place by !reload, so this module
+# must not hold state of its own.
+
+log = logging.getLogger("bot.commands")
+
+# --- Bulk purge for !clear ---
+
+# Upper limits for one !clear run (matching messages deleted / history messages looked at)
+CLEAR_MAX_AMOUNT = int(os.getenv('CLEAR_MAX_AMOUNT', '10000'))
+CLEAR_MAX_SCAN = int(os.getenv('CLEAR_MAX_SCAN', '50000'))
+
+# Discord's bulk delete takes 2-100 messages, all younger than 14 days (minus a safety margin)
+BULK_DELETE_LIMIT = 100
+BULK_DELETE_MAX_AGE = datetime.timedelta(days=14) - datetime.timedelta(minutes=5)
+
+# Edit the progress message at most this often (seconds) to stay clear of the edit rate limit
+CLEAR_PROGRESS_INTERVAL = 2.0
+
+def parse_clear_filter(args):
+    """Builds the message filter for !clear from the words after the amount.
+
+    Supported: a user mention or ID (only that author), "bots" (only bot messages)
+    and "text:<words>" (only messages containing the words, case-insensitive).
+    Returns (check, description) or None if an argument is not understood.
+    """
+    author_id = None
+    bots_only = False
+    contains = None
+    for i, arg in enumerate(args):
+        if arg.lower().startswith("text:"):
+            contains = " ".join([arg[5:]] + args[i + 1:]).lower()
+            break
+        if arg.lower() in ("bot", "bots"):
+            bots_only = True
+            continue
+        user_id = arg.strip("<@!>")
+        if user_id.isdigit():
+            author_id = int(user_id)
+            continue
+        return None
+
+    def check(msg):
+        if author_id is not None and msg.author.id != author_id:
+            return False
+        if bots_only and not msg.author.bot:
+            return False
+        if contains is not None and contains not in msg.content.lower():
+            return False
+        return True
+
+    parts = []
+    if author_id is not None:
+        parts.append(f"von <@{author_id}>")
+    if bots_only:
+        parts.append("von Bots")
+    if contains is not None:
+        parts.append(f"mit \"{contains}\"")
+    return check, " ".join(parts)
+
+async def stream_purge(channel, before, amount, check, on_progress):
+    """Deletes up to `amount` messages matching `check` from the channel history before `before`.
+
+    Walks the history page by page instead of loading it all, bulk-deletes matching messages
+    in batches of 100 and only deletes messages older than 14 days one by one (Discord does
+    not bulk-delete those). Each request goes through discord.py's rate limit buckets, so a
+    large purge is slowed down instead of running into 429s. Returns (deleted, scanned).
+    """
+    bulk_cutoff = discord.utils.utcnow() - BULK_DELETE_MAX_AGE
+    batch = []
+    deleted = 0
+    scanned = 0
+
+    async def flush():
+        nonlocal batch, deleted
+        if batch:
+            await channel.delete_messages(batch)
+            deleted += len(batch)
+            batch = []
+            await on_progress(deleted, scanned)
+
+    async for msg in channel.history(limit=CLEAR_MAX_SCAN, before=before):
+        scanned += 1
+        if not check(msg):
+            continue
+
+        if msg.created_at > bulk_cutoff:
+            batch.append(msg)
+            if len(batch) == BULK_DELETE_LIMIT:
+                await flush()
+        else:
+            # History goes from new to old, so everything after this is too old for bulk deletes
+            await flush()
+            try:
+                await msg.delete()
+                deleted += 1
+            except discord.NotFound:
+                pass
+            await on_progress(deleted, scanned)
+
+        if deleted + len(batch) >= amount:
+            break
+
+    await flush()
+    return deleted, scanned
+
+# --- Command router ---
+
+COMMAND_PREFIX = "!"
+
+# Parsed once at import instead of on every admin command
+BOT_OWNER_ID = int(os.getenv('BOT_OWNER_ID', '0'))
+
+def is_admin(member):
+    """Administrators and the bot owner."""
+    return member.guild_permissions.administrator or member.id == BOT_OWNER_ID
+
+def can_manage_messages(member):
+    """Members with the manage messages permission."""
+    return member.guild_permissions.manage_messages
+
+# Maps command name (without prefix) -> (handler, permission check or None, cooldown in seconds, denied message)
+COMMANDS = {}
+
+# Expired cooldowns are dropped once command_cooldowns holds this many entries
+# (and again whenever it has doubled since, so a sweep is paid for by the entries added in between)
+COOLDOWN_SWEEP_SIZE = 1000
+_next_cooldown_sweep = COOLDOWN_SWEEP_SIZE
+
+def prune_cooldowns(now):
+    """Drops every cooldown that has expired."""
+    global _next_cooldown_sweep
+    for key in [key for key, expires in command_cooldowns.items() if expires <= now]:
+        del command_cooldowns[key]
+    _next_cooldown_sweep = max(COOLDOWN_SWEEP_SIZE, 2 * len(command_cooldowns))
+
+def command(name, permission=None, cooldown=0, denied_message="❌ Du hast keine Berechtigung für diesen Befehl!"):
+    """Registers a handler(message, args) for !<name> in the COMMANDS table."""
+    def decorator(handler):
+        COMMANDS[name] = (handler, permission, cooldown, denied_message)
+        return handler
+    return decorator
+
+async def send_error(message, text):
+    """Tells the user what went wrong - by DM, or briefly in the channel if DMs are closed."""
+    # Send ephemeral-like message by DMing the user
+    try:
+        await message.author.send(text)
+    except:
+        # If DM fails, send in channel but delete quickly
+        error_msg = await message.channel.send(text)
+        deletion_scheduler.schedule_message_delete(error_msg, 3)
+    await message.delete()
+
+async def handle_message(message):
+    """Dispatches a message to its command handler (called by on_message for every message)."""
+    content = message.content
+    # Almost all messages are normal chat - reject them after a single character check
+    if not content.startswith(COMMAND_PREFIX):
+        return
+
+    parts = content[len(COMMAND_PREFIX):].split()
+    entry = COMMANDS.get(parts[0]) if parts else None
+    if entry is None:
+        return
+    name, args = parts[0], parts[1:]
+    handler, permission, cooldown, denied_message = entry
+
+    if permission is not None and not permission(message.author):
+        await send_error(message, denied_message)
+        return
+
+    if cooldown:
+        key = (name, message.author.id)
+        now = time.monotonic()
+        if now < command_cooldowns.get(key, float('-inf')):
+            log.debug("!%s is on cooldown for %s", name, message.author)
+            return
+        if len(command_cooldowns) >= _next_cooldown_sweep:
+            prune_cooldowns(now)
+        command_cooldowns[key] = now + cooldown
+
+    await handler_profiler.run(f"{COMMAND_PREFIX}{name}", handler(message, args))
+
+# --- Commands ---
+
+# Basic example commands
+@command("hallo", cooldown=3)
+async def hallo_command(message, args):
+    await message.delete()  # Delete command message
+    reply = await message.channel.send('Hallo!')
+    deletion_scheduler.schedule_message_delete(reply, 5)  # Auto-delete after 5 seconds
+
+@command("ping", cooldown=3)
+async def ping_command(message, args):
+    await message.delete()  # Delete command message
+    reply = await message.channel.send('Pong!')
+    deletion_scheduler.schedule_message_delete(reply, 5)  # Auto-delete after 5 seconds
+
+@command("info", cooldown=3)
+async def info_command(message, args):
+    await message.delete()  # Delete command message
+    reply = await message.channel.send(f'I am a Discord bot, created by {message.author.display_name}.')
+    deletion_scheduler.schedule_message_delete(reply, 5)  # Auto-delete after 5 seconds
+
+# Clear command to delete messages (needs the manage messages permission)
+@command("clear", permission=can_manage_messages, cooldown=5)
+async def clear_command(message, args):
+    # Parse the number of messages to delete and the optional filter
+    try:
+        if args:
+            amount = int(args[0])
+            if amount > CLEAR_MAX_AMOUNT:
+                amount = CLEAR_MAX_AMOUNT
+            elif amount < 1:
+                amount = 1
+        else:
+            amount = 1  # Default to 1 if no number specified
+        message_filter = parse_clear_filter(args[1:])
+        if message_filter is None:
+            raise ValueError(f"unknown !clear filter: {args[1:]}")
+    except ValueError:
+        await send_error(message, "❌ Bitte gib eine gültige Zahl an! Beispiel: `!clear 10`, `!clear 500 @User`, `!clear 200 bots` oder `!clear 1000 text:discord.gg`")
+        return
+    check, filter_description = message_filter
+    
+    # Delete the command message first
+    await message.delete()
+    
+    # One progress message that is edited while the purge runs (it is newer than the
+    # command, so the purge - which starts before the command - never touches it)
+    progress_msg = await message.channel.send(f"🧹 Lösche Nachrichten{' ' + filter_description if filter_description else ''}... 0/{amount}")
+    last_progress = time.monotonic()
+    
+    async def report_progress(deleted, scanned):
+        nonlocal last_progress
+        if time.monotonic() - last_progress >= CLEAR_PROGRESS_INTERVAL:
+            last_progress = time.monotonic()
+            await progress_msg.edit(content=f"🧹 {deleted}/{amount} Nachrichten gelöscht ({scanned} durchsucht)...")
+    
+    # Delete the specified number of messages
+    deleted, scanned = await stream_purge(message.channel, message, amount, check, report_progress)
+    CLEAR_DELETED_MESSAGES.inc(deleted)
+    
+    # Turn the progress message into the success message
+    embed = discord.Embed(
+        title="✅ Aktion erfolgreich!",
+        description=f"Somit hast du {deleted} Nachrichten aus diesem Kanal gelöscht.",
+        color=discord.Color.green()
+    )
+    embed.set_footer(text="GalaxyBot", icon_url=client.user.avatar.url if client.user.avatar else None)
+    
+    # Show the embed and delete it after 5 seconds
+    await progress_msg.edit(content=None, embed=embed)
+    deletion_scheduler.schedule_message_delete(progress_msg, 5)
+
+# Reload command - nur für Administratoren/Owner
+@command("reload", permission=is_admin)
+async def reload_command(message, args):
+    await message.delete()  # Delete command message
+    
+    # "!reload" re-imports the handlers in place, "!reload full" restarts the whole process
+    try:
+        if args and args[0].lower() == 'full':
+            reload_msg = await message.channel.send("🔄 Bot wird neu geladen...")
+            # A broken config file would stop the new process right at startup
+            reloader.check_config_files()
+        else:
+            reload_msg = await message.channel.send("🔄 Handler werden neu geladen...")
+            if await reloader.hot_reload():
+                await reload_msg.edit(content="✅ Handler neu geladen.")
+                deletion_scheduler.schedule_message_delete(reload_msg, 3)
+                return
+            # Fall back to a full restart if the modules could not be re-imported
+            await reload_msg.edit(content="⚠️ Neu laden fehlgeschlagen - Bot wird komplett neu gestartet...")
+    except reloader.ConfigError as e:
+        # The bot keeps running with the previous configuration
+        await reload_msg.edit(content=f"❌ Konfiguration fehlerhaft, die bisherige bleibt aktiv:\n```{str(e)[:1800]}```")
+        return
+    
+    # Persisted with the other pending deletions, so it is removed after the restart
+    deletion_scheduler.schedule_message_delete(reload_msg, 2)
+    await reloader.reload_bot()
+
+# New command to send the Ticket System message with buttons (Admin only)
+@command("ticketsystem", permission=is_admin,
+         denied_message="❌ Du hast keine Berechtigung für diesen Befehl! Nur Administratoren können das Ticket-System erstellen.")
+async def ticketsystem_command(message, args):
+    # Create the Embed (lists every configured ticket type)
+    embed = tickets.build_ticket_panel_embed()
+
+    # Send the message with the Embed and the View (buttons)
+    await message.channel.send(embed=embed, view=tickets.TicketSystemView())
+    await message.delete() # Optional: delete the command message to keep the channel clean
+
+def format_duration(seconds):
+    """Short German duration, e.g. "45 Min." or "3 Std. 20 Min."."""
+    minutes = int(seconds // 60)
+    if minutes < 60:
+        return f"{minutes} Min."
+    hours, minutes = divmod(minutes, 60)
+    if hours < 48:
+        return f"{hours} Std. {minutes} Min."
+    return f"{hours // 24} Tage {hours % 24} Std."
+
+# Ticket queue statistics - Admin only
+@command("ticketstats", permission=is_admin)
+async def ticketstats_command(message, args):
+    stats = ticket_stats.summary(message.guild.id)
+    labels = {ticket_type.channel_type: ticket_type.label for ticket_type in TICKET_TYPES.values()}
+    
+    embed = discord.Embed(title="📊 Ticket-Statistik", color=discord.Color.blue())
+    by_type = "\n".join(f"{labels.get(ticket_type, ticket_type)}: **{count}**"
+                        for ticket_type, count in sorted(stats["open_by_type"].items()))
+    embed.add_field(name=f"Offene Tickets: {stats['open']}", value=by_type or "Keine", inline=False)
+    
+    oldest = stats["oldest_open"]
+    if oldest:
+        embed.add_field(name="Ältestes offenes Ticket", value=f"<#{oldest['channel_id']}> (seit {format_duration(oldest['age_seconds'])})", inline=False)
+    
+    response = stats["first_response"]
+    if response["count"]:
+        value = (f"Durchschnitt: {format_duration(response['average_seconds'])}\n"
+                 f"Median: höchstens {format_duration(response['median_seconds_at_most'])}\n"
+                 f"Maximum: {format_duration(response['max_seconds'])} ({response['count']} Tickets)")
+    else:
+        value = "Noch keine Antworten gemessen"
+    embed.add_field(name="Erste Antwort vom Team", value=value, inline=False)
+    embed.add_field(name="Warten auf erste Antwort", value=str(stats["awaiting_first_response"]), inline=True)
+    since_start = stats["since_start"]
+    embed.add_field(name="Seit dem Start", value=f"{since_start['opened']} erstellt, {since_start['closed']} geschlossen, {since_start['deleted']} gelöscht", inline=True)
+    
+    await message.channel.send(embed=embed)
+    await message.delete()
+
+# Handler latency report - Admin only
+PERF_COLUMNS = ("wall_ms", "rest_ms", "blocked_ms")
+
+def format_perf_table(snapshot):
+    """Renders the profiler snapshot as a fixed-width table (p50/p99 per column, in ms)."""
+    lines = [f"{'handler':<22} {'calls':>6} {'wall p50/p99':>14} {'rest p50/p99':>14} {'blocked p50/p99':>16} {'max step':>9}"]
+    for key, stats in snapshot.items():
+        columns = [f"{stats[name]['p50']:.0f}/{stats[name]['p99']:.0f}" for name in PERF_COLUMNS]
+        lines.append(f"{key[:22]:<22} {stats['calls']:>6} {columns[0]:>14} {columns[1]:>14} {columns[2]:>16} {stats['max_step_ms']['max']:>9.1f}")
+    return "\n".join(lines)
+
+@command("perf", permission=is_admin)
+async def perf_command(message, args):
+    # "!perf" shows the table, "!perf reset" clears it, "!perf profile <handler>" profiles its
+    # next call and "!perf result <handler>" sends the captured cProfile report
+    action = args[0].lower() if args else ""
+    if action == "reset":
+        handler_profiler.reset()
+        await message.channel.send("✅ Handler-Statistiken zurückgesetzt.")
+    elif action == "profile" and len(args) > 1:
+        handler_profiler.arm_profile(args[1])
+        await message.channel.send(f"🔬 Der nächste Aufruf von `{args[1]}` wird mit cProfile aufgezeichnet. Ergebnis mit `!perf result {args[1]}`.")
+    elif action == "result" and len(args) > 1:
+        report = handler_profiler.profiles.get(args[1])
+        if report is None:
+            await message.channel.send(f"❌ Für `{args[1]}` wurde noch kein Profil aufgezeichnet.")
+        else:
+            await message.channel.send(file=discord.File(io.BytesIO(report.encode("utf-8")), filename=f"profile-{args[1].strip('!')}.txt"))
+    else:
+        snapshot = handler_profiler.snapshot()
+        if not snapshot:
+            await message.channel.send("📊 Noch keine Handler-Aufrufe gemessen.")
+            return
+        table = format_perf_table(snapshot)
+        # Discord messages are limited to 2000 characters
+        if len(table) > 1900:
+            await message.channel.send(file=discord.File(io.BytesIO(table.encode("utf-8")), filename="perf.txt"))
+        else:
+            await message.channel.send(f"📊 Handler-Latenzen (ms, letzte {handler_profiler.window} Aufrufe je Handler):\n```\n{table}\n```")
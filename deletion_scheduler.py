@@ -0,0 +1,205 @@
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import os
+import time
+
+import discord
+
+log = logging.getLogger("bot.deletions")
+
+# Discord's bulk delete endpoint takes at most 100 message IDs per call
+BULK_DELETE_LIMIT = 100
+
+# Jobs due within this many seconds of each other are executed together (and batched per channel)
+BATCH_WINDOW = 0.5
+
+# How often a held channel deletion checks again whether its hold (e.g. a transcript) is done
+HOLD_RECHECK_INTERVAL = 1.0
+
+class DeletionScheduler:
+    """Deletes messages and channels at a due time from one background task.
+
+    Handlers call schedule_message_delete / schedule_channel_delete and return right away
+    instead of holding a coroutine in asyncio.sleep. Jobs live in a heap ordered by due time;
+    message deletions that come due together are bulk-deleted per channel. Pending jobs are
+    written to a JSON file so they survive a restart (e.g. !reload).
+    """
+
+    def __init__(self, client, path):
+        self.client = client
+        self.path = path
+        self._heap = []
+        self._sequence = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._dirty = False
+        self._task = None
+        # channel ID -> task that has to finish before the channel may be deleted
+        self._holds = {}
+
+    def __len__(self):
+        return len(self._heap)
+
+    # --- Scheduling (safe to call from any handler, never blocks) ---
+
+    def schedule_message_delete(self, message, delay):
+        """Deletes a message after `delay` seconds."""
+        self._push(time.time() + delay, {
+            "kind": "message",
+            "channel_id": message.channel.id,
+            "message_id": message.id,
+        })
+
+    def schedule_channel_delete(self, channel, delay, reason=None):
+        """Deletes a channel after `delay` seconds."""
+        self._push(time.time() + delay, {
+            "kind": "channel",
+            "channel_id": channel.id,
+            "reason": reason,
+        })
+
+    def hold_channel_delete(self, channel, task):
+        """Keeps a scheduled deletion of the channel waiting until `task` is done (e.g. its transcript)."""
+        if task is not None:
+            self._holds[channel.id] = task
+
+    def _push(self, due, job):
+        heapq.heappush(self._heap, (due, next(self._sequence), job))
+        self._dirty = True
+        self._wakeup.set()
+
+    # --- Persistence ---
+
+    def load(self):
+        """Loads the jobs that were pending when the bot last stopped."""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            log.error("Could not read pending deletions from %s: %s", self.path, e)
+            return
+
+        for entry in data.get("jobs", []):
+            due = entry.pop("due")
+            heapq.heappush(self._heap, (due, next(self._sequence), entry))
+        if self._heap:
+            log.info("Loaded %d pending deletions from %s", len(self._heap), self.path)
+
+    def _snapshot(self):
+        return {"jobs": [dict(job, due=due) for due, _, job in sorted(self._heap, key=lambda item: item[:2])]}
+
+    def _write(self, snapshot):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, self.path)
+
+    def save(self):
+        """Writes all pending jobs to disk right away (used before the process restarts)."""
+        try:
+            self._write(self._snapshot())
+            self._dirty = False
+        except OSError as e:
+            log.error("Could not save pending deletions to %s: %s", self.path, e)
+
+    async def _save_in_background(self):
+        self._dirty = False
+        try:
+            await asyncio.to_thread(self._write, self._snapshot())
+        except OSError as e:
+            log.error("Could not save pending deletions to %s: %s", self.path, e)
+
+    # --- Worker ---
+
+    def start(self):
+        """Loads persisted jobs and starts the worker task on the running loop (only once)."""
+        if self._task is None:
+            self.load()
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        # Channels have to be in the cache before anything can be resolved
+        await self.client.wait_until_ready()
+        while True:
+            self._wakeup.clear()
+            if self._dirty:
+                await self._save_in_background()
+
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+
+            delay = self._heap[0][0] - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            batch_until = time.time() + BATCH_WINDOW
+            jobs = []
+            while self._heap and self._heap[0][0] <= batch_until:
+                jobs.append(heapq.heappop(self._heap)[2])
+            await self._execute(jobs)
+            self._dirty = True
+
+    async def _execute(self, jobs):
+        # Group message deletions per channel so they can go out as bulk deletes
+        messages_by_channel = {}
+        for job in jobs:
+            if job["kind"] == "message":
+                messages_by_channel.setdefault(job["channel_id"], []).append(job["message_id"])
+
+        for channel_id, message_ids in messages_by_channel.items():
+            try:
+                await self._delete_messages(channel_id, message_ids)
+            except Exception as e:
+                log.exception("Error deleting %d messages in channel %s: %s", len(message_ids), channel_id, e)
+
+        for job in jobs:
+            if job["kind"] != "channel":
+                continue
+            hold = self._holds.get(job["channel_id"])
+            if hold is not None and not hold.done():
+                # Still busy (e.g. exporting the transcript) - check again shortly
+                self._push(time.time() + HOLD_RECHECK_INTERVAL, job)
+                continue
+            self._holds.pop(job["channel_id"], None)
+            channel = self.client.get_channel(job["channel_id"])
+            if channel is None:
+                log.debug("Channel %s is already gone", job["channel_id"])
+                continue
+            try:
+                await channel.delete(reason=job.get("reason"))
+            except discord.NotFound:
+                pass
+            except Exception as e:
+                log.exception("Error deleting channel %s: %s", job["channel_id"], e)
+
+    async def _delete_messages(self, channel_id, message_ids):
+        channel = self.client.get_channel(channel_id) or self.client.get_partial_messageable(channel_id)
+
+        if len(message_ids) > 1 and hasattr(channel, "delete_messages"):
+            for i in range(0, len(message_ids), BULK_DELETE_LIMIT):
+                chunk = message_ids[i:i + BULK_DELETE_LIMIT]
+                try:
+                    await channel.delete_messages([discord.Object(id=message_id) for message_id in chunk])
+                    continue
+                except discord.HTTPException as e:
+                    # e.g. a message older than 14 days or already deleted - fall back to single deletes
+                    log.debug("Bulk delete in channel %s failed (%s), deleting one by one", channel_id, e)
+                await self._delete_individually(channel, chunk)
+        else:
+            await self._delete_individually(channel, message_ids)
+
+    async def _delete_individually(self, channel, message_ids):
+        for message_id in message_ids:
+            try:
+                await channel.get_partial_message(message_id).delete()
+            except discord.NotFound:
+                pass
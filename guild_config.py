@@ -0,0 +1,196 @@
+import asyncio
+import json
+import logging
+import os
+from dataclasses import dataclass, field
+
+log = logging.getLogger("bot.guild_config")
+
+# Settings a guild section may contain (anything left out comes from the "default" section)
+SETTINGS = ("admin_roles", "support_roles", "category_ids", "overflow_category_name", "category_overflow")
+
+# Used for everything the "default" section of the file leaves out (and without a file)
+BUILTIN_DEFAULTS = {
+    "admin_roles": ["OWNER", "Admin"],
+    "category_ids": [],
+    "overflow_category_name": "Tickets",
+    "category_overflow": True,
+}
+
+def _section(value, where):
+    if not isinstance(value, dict):
+        raise ValueError(f"{where} must be an object")
+    return value
+
+def _role_names(value, where):
+    if isinstance(value, str):
+        return (value,)
+    if not isinstance(value, list) or not all(isinstance(name, str) for name in value):
+        raise ValueError(f"{where} must be a role name or a list of role names")
+    return tuple(value)
+
+@dataclass(frozen=True)
+class GuildConfig:
+    """The compiled settings of one guild. Never changed - a reload builds new ones."""
+
+    # Roles that always have access to all tickets (and get pinged in every ticket)
+    admin_roles: tuple
+    # ticket type key -> support role names, for the types this guild overrides
+    support_roles: dict = field(hash=False)
+    # Categories the ticket channels are created in, filled in this order
+    category_ids: tuple = ()
+    # When all ticket categories are full, new ones named "<name> 2", "<name> 3", ... are created
+    overflow_category_name: str = "Tickets"
+    category_overflow: bool = True
+    # Admin roles plus the support roles of every ticket type (whose members may close and delete tickets)
+    staff_role_names: frozenset = frozenset()
+
+    def support_roles_for(self, ticket_type):
+        """Support role names of a ticket type in this guild (the registry's roles unless overridden)."""
+        return self.support_roles.get(ticket_type.key, ticket_type.support_roles)
+
+def compile_guild_config(settings, ticket_types, where):
+    """Validates one merged settings dict and precomputes the staff role names."""
+    unknown = set(settings) - set(SETTINGS)
+    if unknown:
+        raise ValueError(f"{where} has unknown settings: {', '.join(sorted(unknown))}")
+
+    admin_roles = _role_names(settings.get("admin_roles", []), f"{where}.admin_roles")
+    support_roles = {}
+    for key, names in _section(settings.get("support_roles", {}), f"{where}.support_roles").items():
+        if key not in ticket_types:
+            raise ValueError(f"{where}.support_roles names unknown ticket type {key!r}")
+        support_roles[key] = list(_role_names(names, f"{where}.support_roles.{key}"))
+
+    category_ids = settings.get("category_ids", [])
+    if not isinstance(category_ids, list) or not all(isinstance(category_id, int) for category_id in category_ids):
+        raise ValueError(f"{where}.category_ids must be a list of category IDs")
+
+    staff_role_names = set(admin_roles)
+    for key, ticket_type in ticket_types.items():
+        staff_role_names.update(support_roles.get(key, ticket_type.support_roles))
+
+    return GuildConfig(
+        admin_roles=admin_roles,
+        support_roles=support_roles,
+        category_ids=tuple(category_ids),
+        overflow_category_name=str(settings.get("overflow_category_name", "Tickets")),
+        category_overflow=bool(settings.get("category_overflow", True)),
+        staff_role_names=frozenset(staff_role_names),
+    )
+
+def read_config_file(path):
+    """Reads the guild configuration file (JSON, or YAML if PyYAML is installed)."""
+    with open(path, encoding="utf-8") as f:
+        if path.endswith((".yaml", ".yml")):
+            import yaml  # Optional, only needed for YAML configs
+            return yaml.safe_load(f) or {}
+        return json.load(f)
+
+def compile_config_file(data, ticket_types):
+    """Returns (default config, {guild ID: config}) for the contents of a config file.
+
+    Every guild section is merged over the "default" section, so it only has to list
+    what is different in that guild (support roles are merged per ticket type).
+    """
+    if not isinstance(data, dict):
+        raise ValueError("guild configuration must be an object with \"default\" and \"guilds\" objects")
+    defaults = dict(BUILTIN_DEFAULTS, **_section(data.get("default", {}), "default"))
+    default = compile_guild_config(defaults, ticket_types, "default")
+    guilds = {}
+    for guild_id, settings in _section(data.get("guilds", {}), "guilds").items():
+        if not str(guild_id).isdigit() or not isinstance(settings, dict):
+            raise ValueError(f"guild section {guild_id!r} must be a guild ID with an object of settings")
+        merged = dict(defaults, **settings)
+        merged["support_roles"] = dict(defaults.get("support_roles", {}),
+                                       **_section(settings.get("support_roles", {}), f"guilds.{guild_id}.support_roles"))
+        guilds[int(guild_id)] = compile_guild_config(merged, ticket_types, f"guilds.{guild_id}")
+    return default, guilds
+
+class GuildConfigRegistry:
+    """Per-guild settings (admin and support roles, ticket categories), compiled once per file version.
+
+    The whole configuration lives in one immutable snapshot that a reload replaces with a
+    single assignment, so a handler that looked up its guild's config keeps a consistent
+    view even while a new version is swapped in. The file is watched for changes and
+    reloaded without a restart; a broken file is logged and the old config stays active.
+    """
+
+    def __init__(self, path, ticket_types, on_change=None):
+        self.path = path
+        self._ticket_types = ticket_types
+        # Called with the IDs of the guilds whose config changed (None = all guilds)
+        self.on_change = on_change
+        self._data = {}
+        self._snapshot = compile_config_file({}, ticket_types)
+        self._mtime = None
+        self._task = None
+
+    @property
+    def default(self):
+        return self._snapshot[0]
+
+    def get(self, guild_id):
+        """Returns the config of a guild (the default config unless the guild has its own section)."""
+        default, guilds = self._snapshot
+        return guilds.get(guild_id, default)
+
+    # --- Loading ---
+
+    def _stat(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def load(self):
+        """Reads the file (at startup). A missing file means defaults only; a broken one raises."""
+        mtime = self._stat()
+        data = read_config_file(self.path) if mtime is not None else {}
+        self._apply(data, compile_config_file(data, self._ticket_types), mtime)
+
+    async def reload(self):
+        """Re-reads the file in a worker thread and swaps in the new config (raises and keeps the old one on errors)."""
+        mtime = self._stat()
+        data = await asyncio.to_thread(read_config_file, self.path) if mtime is not None else {}
+        self._apply(data, compile_config_file(data, self._ticket_types), mtime)
+
+    def set_ticket_types(self, ticket_types):
+        """Recompiles the current file contents against a reloaded ticket type registry."""
+        snapshot = compile_config_file(self._data, ticket_types)
+        self._ticket_types = ticket_types
+        self._apply(self._data, snapshot, self._mtime)
+
+    def _apply(self, data, snapshot, mtime):
+        old_default, old_guilds = self._snapshot
+        default, guilds = snapshot
+        self._data = data
+        self._mtime = mtime
+        self._snapshot = snapshot
+        if old_default != default:
+            changed = None
+        else:
+            changed = {guild_id for guild_id in old_guilds.keys() | guilds.keys()
+                       if old_guilds.get(guild_id, old_default) != guilds.get(guild_id, default)}
+        log.info("Loaded guild configuration from %s (%d guild sections)", self.path, len(guilds))
+        if self.on_change is not None and (changed is None or changed):
+            self.on_change(changed)
+
+    # --- Watching ---
+
+    def start(self, interval):
+        """Checks the file for changes every `interval` seconds on the running loop (only once, 0 = never)."""
+        if self._task is None and interval > 0:
+            self._task = asyncio.create_task(self._watch(interval))
+
+    async def _watch(self, interval):
+        while True:
+            await asyncio.sleep(interval)
+            if self._stat() == self._mtime:
+                continue
+            try:
+                await self.reload()
+            except Exception as e:
+                # Keep the old config (also on YAML syntax errors), and don't retry until the file changes again
+                self._mtime = self._stat()
+                log.error("Guild configuration %s not applied, keeping the previous one: %s", self.path, e)
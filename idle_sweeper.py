@@ -0,0 +1,97 @@
+import asyncio
+import logging
+import time
+
+import discord
+
+log = logging.getLogger("bot.idle")
+
+class IdleTicketSweeper:
+    """Closes open tickets that had no message for `idle_after` seconds, from one background task.
+
+    A channel's last activity is the timestamp inside its last_message_id snowflake, which
+    the gateway keeps current in the channel cache - a sweep makes no history requests.
+    At most `concurrency` tickets are closed at the same time and at most `batch_limit` per
+    sweep (oldest first), so a large backlog is worked off over several sweeps instead of
+    using up the REST rate limits the buttons need.
+    """
+
+    def __init__(self, client, store, idle_after, interval=600, concurrency=2, batch_limit=25):
+        self.client = client
+        self.store = store
+        self.idle_after = idle_after
+        self.interval = interval
+        self.concurrency = concurrency
+        self.batch_limit = batch_limit
+        self._close = None
+        self._task = None
+
+    def start(self, close):
+        """Starts sweeping on the running loop (only once, not at all if idle_after is 0).
+
+        `close(channel)` closes one ticket and is awaited for every idle ticket found.
+        """
+        if self._task is None and self.idle_after > 0:
+            self._close = close
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        # Channels have to be in the cache before their last messages can be checked
+        await self.client.wait_until_ready()
+        while True:
+            try:
+                await self.sweep()
+            except Exception as e:
+                log.exception("Idle ticket sweep failed: %s", e)
+            await asyncio.sleep(self.interval)
+
+    def last_activity(self, channel, ticket):
+        """Unix time of the last message in the channel (the ticket's creation if there is none)."""
+        if channel.last_message_id:
+            return discord.utils.snowflake_time(channel.last_message_id).timestamp()
+        return ticket.created_at
+
+    def _idle_channel(self, ticket, now):
+        """Returns the ticket's channel if the ticket is still open and idle, else None."""
+        if ticket.state != "open":
+            return None
+        channel = self.client.get_channel(ticket.channel_id)
+        if channel is None or now - self.last_activity(channel, ticket) < self.idle_after:
+            return None
+        return channel
+
+    def find_idle(self, now=None):
+        """Returns the idle open tickets, longest idle first, at most batch_limit of them."""
+        now = time.time() if now is None else now
+        idle = []
+        for ticket in self.store.open_tickets():
+            channel = self._idle_channel(ticket, now)
+            if channel is not None:
+                idle.append((self.last_activity(channel, ticket), ticket))
+        idle.sort(key=lambda entry: entry[0])
+        return [ticket for _, ticket in idle[:self.batch_limit]]
+
+    async def sweep(self):
+        """Closes the idle tickets found right now. Returns how many were closed."""
+        idle = self.find_idle()
+        if not idle:
+            return 0
+        semaphore = asyncio.Semaphore(self.concurrency)
+        closed = 0
+
+        async def close(ticket):
+            nonlocal closed
+            async with semaphore:
+                # Someone may have written or closed the ticket while it waited for its turn
+                channel = self._idle_channel(ticket, time.time())
+                if channel is None:
+                    return
+                try:
+                    await self._close(channel)
+                    closed += 1
+                except discord.HTTPException as e:
+                    log.warning("Could not auto-close idle ticket #%s: %s", channel.name, e)
+
+        await asyncio.gather(*(close(ticket) for ticket in idle))
+        log.info("Auto-closed %s of %s idle tickets", closed, len(idle))
+        return closed
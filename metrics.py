@@ -0,0 +1,135 @@
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+# All metrics in creation order, rendered by render_metrics() for the /metrics endpoint
+REGISTRY = []
+
+# Default latency buckets in seconds (Discord REST calls usually land between 50ms and 1s)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _format_value(value):
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    return repr(float(value))
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(labelnames, labelvalues, extra=()):
+    pairs = list(zip(labelnames, labelvalues)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label(value)}"' for name, value in pairs) + "}"
+
+class _Metric:
+    """Base class: a named metric with optional labels, updated from the event loop and read by Flask."""
+
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(labels[name] for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+class Counter(_Metric):
+    """Monotonically increasing count, e.g. deleted tickets."""
+
+    type = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self):
+        with self._lock:
+            values = dict(self._values)
+        if not values and not self.labelnames:
+            values = {(): 0}
+        for key, value in values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+class Gauge(_Metric):
+    """Current value, either set explicitly or read from a callback at scrape time."""
+
+    type = "gauge"
+
+    def __init__(self, name, documentation, callback=None):
+        super().__init__(name, documentation)
+        self._value = 0.0
+        self._callback = callback
+
+    def set(self, value):
+        self._value = value
+
+    def _samples(self):
+        value = self._callback() if self._callback else self._value
+        yield f"{self.name} {_format_value(value)}"
+
+class Histogram(_Metric):
+    """Distribution of observed values (usually durations in seconds) over fixed buckets."""
+
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["buckets"][i] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observes the duration of the with-block (works across awaits inside it)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self):
+        with self._lock:
+            series = {key: {"buckets": list(s["buckets"]), "sum": s["sum"], "count": s["count"]}
+                      for key, s in self._series.items()}
+        for key, s in series.items():
+            for bound, count in zip(self.buckets, s["buckets"]):
+                labels = _format_labels(self.labelnames, key, [("le", _format_value(bound))])
+                yield f"{self.name}_bucket{labels} {count}"
+            labels = _format_labels(self.labelnames, key, [("le", "+Inf")])
+            yield f"{self.name}_bucket{labels} {s['count']}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(s['sum'])}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, key)} {s['count']}"
+
+def render_metrics():
+    """Renders every registered metric in the Prometheus text exposition format."""
+    return "\n".join(metric.render() for metric in REGISTRY) + "\n"
@@ -0,0 +1,214 @@
+import collections
+import contextvars
+import cProfile
+import io
+import logging
+import pstats
+import threading
+import time
+
+log = logging.getLogger("bot.perf")
+
+# Lines of the cProfile report kept per capture (sorted by cumulative time)
+PROFILE_REPORT_LINES = 40
+
+def percentile(ordered, q):
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+class _Sample:
+    """Timings of one handler call, filled in while it runs."""
+
+    __slots__ = ("rest", "blocked", "max_step", "slow_steps", "done")
+
+    def __init__(self):
+        self.rest = 0.0
+        self.blocked = 0.0
+        self.max_step = 0.0
+        self.slow_steps = 0
+        self.done = False
+
+class _TimedCoroutine:
+    """Drives a coroutine step by step and measures how long each step holds the event loop.
+
+    A step is the synchronous stretch between two awaits that actually suspend, i.e. the
+    time no other handler, heartbeat or timer can run. With a cProfile.Profile the profiler
+    is only enabled during these steps, so concurrent handlers do not end up in the report.
+    Only used for the sampled calls - driving every step from Python costs a few microseconds.
+    """
+
+    def __init__(self, coro, key, sample, slow_step, profile):
+        self._coro = coro
+        self._key = key
+        self._sample = sample
+        self._slow_step = slow_step
+        self._profile = profile
+
+    def __await__(self):
+        coro = self._coro
+        sample = self._sample
+        profile = self._profile
+        send, error = None, None
+        while True:
+            if profile is not None:
+                profile.enable()
+            start = time.perf_counter()
+            try:
+                if error is not None:
+                    future = coro.throw(error)
+                else:
+                    future = coro.send(send)
+            except StopIteration as stop:
+                return stop.value
+            finally:
+                step = time.perf_counter() - start
+                if profile is not None:
+                    profile.disable()
+                sample.blocked += step
+                if step > sample.max_step:
+                    sample.max_step = step
+                if step >= self._slow_step:
+                    sample.slow_steps += 1
+                    log.warning("%s blocked the event loop for %.0f ms in one step", self._key, step * 1000)
+            try:
+                send, error = (yield future), None
+            except GeneratorExit:
+                coro.close()
+                raise
+            except BaseException as e:
+                send, error = None, e
+
+class HandlerProfiler:
+    """Rolling latency statistics per handler (button custom_id or !command).
+
+    Every call records its wall time and the time spent in Discord REST requests (from
+    the aiohttp trace hooks, attributed through a context variable). Every `step_sample`th
+    call is also driven step by step to measure how long it blocked the event loop. The
+    last `window` calls per handler are kept for percentiles. A single call of one handler
+    can be captured with cProfile on demand.
+    """
+
+    def __init__(self, window=500, slow_step=0.1, step_sample=20):
+        self.window = window
+        self.slow_step = slow_step
+        # Time the steps of every n-th call (0 = only profiled calls)
+        self.step_sample = step_sample
+        self._calls = 0
+        self._lock = threading.Lock()
+        # key -> deque of (wall, rest, blocked, max_step) of the last `window` calls
+        # (blocked and max_step are None for calls whose steps were not timed)
+        self._samples = {}
+        # key -> [calls, errors, slow steps] since start (or the last reset)
+        self._totals = {}
+        self._current = contextvars.ContextVar("perf_sample", default=None)
+        # Handler key whose next call is profiled, and the latest report per key
+        self._armed = None
+        self.profiles = {}
+
+    # --- Measuring ---
+
+    def wrap(self, key, callback):
+        """Returns `callback` (a coroutine function) with every call measured under `key`."""
+        async def profiled(*args, **kwargs):
+            return await self.run(key, callback(*args, **kwargs))
+        return profiled
+
+    async def run(self, key, coro):
+        """Awaits the handler coroutine and records its timings under `key`."""
+        sample = _Sample()
+        profile = None
+        if self._armed == key:
+            self._armed = None
+            profile = cProfile.Profile()
+        self._calls += 1
+        timed = profile is not None or (self.step_sample and self._calls % self.step_sample == 0)
+        token = self._current.set(sample)
+        failed = False
+        start = time.perf_counter()
+        try:
+            if timed:
+                return await _TimedCoroutine(coro, key, sample, self.slow_step, profile)
+            return await coro
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            wall = time.perf_counter() - start
+            sample.done = True
+            self._current.reset(token)
+            self._record(key, wall, sample, timed, failed)
+            if profile is not None:
+                self._store_profile(key, profile, wall)
+
+    def _record(self, key, wall, sample, timed, failed):
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = self._samples[key] = collections.deque(maxlen=self.window)
+                self._totals[key] = [0, 0, 0]
+            if timed:
+                samples.append((wall, sample.rest, sample.blocked, sample.max_step))
+            else:
+                samples.append((wall, sample.rest, None, None))
+            totals = self._totals[key]
+            totals[0] += 1
+            totals[1] += failed
+            totals[2] += sample.slow_steps
+
+    # --- aiohttp trace hooks (REST time of the handler that made the request) ---
+
+    async def on_request_start(self, session, context, params):
+        context.perf_sample = self._current.get()
+        context.perf_start = time.perf_counter()
+
+    async def on_request_end(self, session, context, params):
+        sample = getattr(context, "perf_sample", None)
+        # Tasks spawned by a handler inherit its sample - only count requests made while it runs
+        if sample is not None and not sample.done:
+            sample.rest += time.perf_counter() - context.perf_start
+
+    on_request_exception = on_request_end
+
+    # --- cProfile capture ---
+
+    def arm_profile(self, key):
+        """Profiles the next call of the handler `key` (replaces an armed but unused capture)."""
+        self._armed = key
+
+    def _store_profile(self, key, profile, wall):
+        out = io.StringIO()
+        stats = pstats.Stats(profile, stream=out)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(PROFILE_REPORT_LINES)
+        header = f"{key} - {wall * 1000:.1f} ms wall, captured {time.strftime('%Y-%m-%d %H:%M:%S')}\n"
+        self.profiles[key] = header + out.getvalue()
+        log.info("Captured a profile of %s (%.1f ms)", key, wall * 1000)
+
+    # --- Reading ---
+
+    def snapshot(self):
+        """Returns {key: stats} with p50/p95/p99/max in milliseconds over the rolling window."""
+        with self._lock:
+            samples = {key: list(values) for key, values in self._samples.items()}
+            totals = {key: list(values) for key, values in self._totals.items()}
+        result = {}
+        for key, values in sorted(samples.items()):
+            calls, errors, slow_steps = totals[key]
+            stats = {"calls": calls, "errors": errors, "slow_steps": slow_steps, "window": len(values)}
+            for i, name in enumerate(("wall", "rest", "blocked", "max_step")):
+                ordered = sorted(value[i] for value in values if value[i] is not None)
+                stats[f"{name}_ms"] = {
+                    "p50": round(percentile(ordered, 50) * 1000, 2),
+                    "p95": round(percentile(ordered, 95) * 1000, 2),
+                    "p99": round(percentile(ordered, 99) * 1000, 2),
+                    "max": round(ordered[-1] * 1000, 2) if ordered else 0.0,
+                }
+            result[key] = stats
+        return result
+
+    def reset(self):
+        """Forgets all samples (the armed capture and stored profiles are kept)."""
+        with self._lock:
+            self._samples.clear()
+            self._totals.clear()
@@ -0,0 +1,88 @@
+import importlib
+import logging
+import os
+import sys
+
+from bot import TICKET_TYPES_FILE, client, deletion_scheduler, guild_configs, reload_ticket_types, ticket_store
+from guild_config import compile_config_file, read_config_file
+from ticket_types import load_ticket_types
+
+import commands
+import tickets
+
+log = logging.getLogger("bot.reload")
+
+class ConfigError(Exception):
+    """A configuration file could not be applied - the running bot keeps the previous version.
+
+    Never answered with a restart: the new process would read the same file at import
+    time and exit.
+    """
+
+def register_persistent_views():
+    """Registers the persistent ticket views so their buttons keep working (also after a restart)."""
+    try:
+        client.add_view(tickets.TicketSystemView())
+        client.add_view(tickets.TicketCloseView())
+        client.add_view(tickets.TicketDeleteOnlyView())
+        client.add_view(tickets.TicketClosedView())
+        log.info("Persistent Views loaded successfully!")
+    except Exception as e:
+        log.exception("Error loading persistent views: %s", e)
+
+async def hot_reload():
+    """Re-reads the ticket types and guild configs, re-imports the ticket and command modules and swaps in their views.
+
+    The gateway connection and everything in bot.py (caches, ticket store, pending
+    deletions) stay as they are. Raises ConfigError if the ticket types or guild configs
+    could not be loaded, returns False if a module could not be re-imported.
+    """
+    log.info("Reloading ticket types, guild configs, ticket and command modules...")
+    try:
+        reload_ticket_types()
+    except Exception as e:
+        log.exception("Could not reload the ticket types: %s", e)
+        raise ConfigError(f"{TICKET_TYPES_FILE}: {e}") from e
+    try:
+        await guild_configs.reload()
+    except Exception as e:
+        # The previous snapshot stays active, like a broken edit seen by the file watcher
+        log.exception("Could not reload the guild configs: %s", e)
+        raise ConfigError(f"{guild_configs.path}: {e}") from e
+    try:
+        importlib.reload(tickets)
+        importlib.reload(commands)
+    except Exception as e:
+        log.exception("Hot reload failed: %s", e)
+        return False
+
+    # Views that were sent with a message are bound to that message and still run the old
+    # code - stop them so the freshly registered persistent views handle every click again
+    for view in client.persistent_views:
+        view.stop()
+    register_persistent_views()
+    log.info("Hot reload finished")
+    return True
+
+def check_config_files():
+    """Reads the configuration files like a fresh process would at import time (raises ConfigError)."""
+    try:
+        ticket_types = load_ticket_types(TICKET_TYPES_FILE)
+    except Exception as e:
+        raise ConfigError(f"{TICKET_TYPES_FILE}: {e}") from e
+    if os.path.exists(guild_configs.path):
+        try:
+            compile_config_file(read_config_file(guild_configs.path), ticket_types)
+        except Exception as e:
+            raise ConfigError(f"{guild_configs.path}: {e}") from e
+
+async def reload_bot():
+    """Reloads the bot by restarting the Python process."""
+    log.info("Bot wird neu geladen...")
+    # Write pending deletions to disk so they are picked up again after the restart
+    deletion_scheduler.save()
+    ticket_store.flush()
+    await client.close()
+
+    # Restart the Python process
+    os.execv(sys.executable, ['python'] + sys.argv)
@@ -0,0 +1,88 @@
+import json
+import logging
+import math
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+
+log = logging.getLogger("bot.sharding")
+
+# Seconds to wait before restarting a worker process that exited
+WORKER_RESTART_DELAY = 10
+
+def parse_shard_ids(spec):
+    """Parses "0-3" or "0,1,5" (or a mix like "0-3,8") into a list of shard IDs, "" into None."""
+    if not spec.strip():
+        return None
+    shard_ids = []
+    for part in spec.split(","):
+        first, _, last = part.strip().partition("-")
+        shard_ids.extend(range(int(first), int(last or first) + 1))
+    return shard_ids
+
+def format_shard_ids(shard_ids):
+    """Formats a contiguous list of shard IDs back into "first-last"."""
+    return f"{shard_ids[0]}-{shard_ids[-1]}"
+
+def fetch_recommended_shard_count(token):
+    """Asks Discord how many shards the bot should use (GET /gateway/bot)."""
+    request = urllib.request.Request(
+        "https://discord.com/api/v10/gateway/bot",
+        headers={"Authorization": f"Bot {token}", "User-Agent": "DiscordBot (discord-bot, 1.0)"},
+    )
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return json.load(response)["shards"]
+
+def split_shards(shard_count, worker_count):
+    """Splits shard IDs 0..shard_count-1 into at most worker_count contiguous ranges."""
+    per_worker = math.ceil(shard_count / worker_count)
+    return [list(range(start, min(start + per_worker, shard_count)))
+            for start in range(0, shard_count, per_worker)]
+
+def run_shard_workers(script, token, worker_count, shard_count, base_port):
+    """Runs the bot as one worker process per shard range and restarts workers that exit.
+
+    Every worker is this same script started with SHARD_IDS/SHARD_COUNT set, its own
+    web server port (base_port + worker index) and its own pending deletions and memory
+    report files (both are read, changed and written back without locking).
+    """
+    if shard_count is None:
+        shard_count = fetch_recommended_shard_count(token)
+    ranges = split_shards(shard_count, worker_count)
+    log.info("Starting %d shard workers for %d shards", len(ranges), shard_count)
+
+    def start_worker(index, shard_ids):
+        shard_range = format_shard_ids(shard_ids)
+        env = dict(
+            os.environ,
+            SHARDED="1",
+            SHARD_WORKERS="0",
+            SHARD_COUNT=str(shard_count),
+            SHARD_IDS=shard_range,
+            PORT=str(base_port + index),
+            DELETION_QUEUE_FILE=f"pending_deletions.shards-{shard_range}.json",
+            MEMORY_REPORT_FILE=f"memory_report.shards-{shard_range}.json",
+        )
+        # SERVER_PORT/PTERODACTYL_PORT win over PORT in get_web_port, so drop them for the workers
+        env.pop("SERVER_PORT", None)
+        env.pop("PTERODACTYL_PORT", None)
+        log.info("Worker %d: shards %s on port %s", index, shard_range, env["PORT"])
+        return subprocess.Popen([sys.executable, script], env=env)
+
+    workers = {index: start_worker(index, shard_ids) for index, shard_ids in enumerate(ranges)}
+    try:
+        while True:
+            time.sleep(1)
+            for index, process in list(workers.items()):
+                if process.poll() is not None:
+                    log.warning("Worker %d exited with code %s, restarting in %ds",
+                                index, process.returncode, WORKER_RESTART_DELAY)
+                    time.sleep(WORKER_RESTART_DELAY)
+                    workers[index] = start_worker(index, ranges[index])
+    except KeyboardInterrupt:
+        for process in workers.values():
+            process.terminate()
+        for process in workers.values():
+            process.wait()
@@ -0,0 +1,42 @@
+import logging
+import time
+
+log = logging.getLogger("bot.startup")
+
+class StartupTimer:
+    """Times the phases of a cold start, from the first import up to the first on_ready.
+
+    Every mark() ends the current phase, so the phases add up to the total. Marks after
+    finish() are ignored - on_connect and on_ready fire again after every reconnect.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._last = self.started
+        # (phase, seconds) in the order they ended
+        self.phases = []
+        self.finished = False
+
+    def mark(self, phase, at=None):
+        """Ends `phase` now (or at the time.perf_counter() value `at`)."""
+        if self.finished:
+            return
+        at = time.perf_counter() if at is None else at
+        self.phases.append((phase, max(at - self._last, 0.0)))
+        self._last = max(at, self._last)
+
+    def finish(self):
+        """Logs the startup report once."""
+        if self.finished:
+            return
+        self.finished = True
+        phases = ", ".join(f"{phase} {seconds * 1000:.0f} ms" for phase, seconds in self.phases)
+        log.info("Cold start took %.2fs: %s", self._last - self.started, phases)
+
+    def as_dict(self):
+        """Phase durations and the total in seconds (the total so far while still starting)."""
+        return {"phases": {phase: round(seconds, 4) for phase, seconds in self.phases},
+                "total": round(self._last - self.started, 4), "finished": self.finished}
+
+# Created on the first import - app.py imports this module before anything else
+startup_timer = StartupTimer()
@@ -0,0 +1,173 @@
+import heapq
+import threading
+import time
+
+# Upper bounds (seconds) of the first response time buckets, used for the approximate median
+RESPONSE_BUCKETS = (60, 300, 900, 1800, 3600, 7200, 14400, 28800, 86400, 172800, float("inf"))
+
+class _GuildStats:
+    """Counters and aggregates of one guild."""
+
+    def __init__(self):
+        # ticket type -> number of open tickets
+        self.open_by_type = {}
+        # channel ID -> (created_at, ticket type) of every open ticket
+        self.open = {}
+        # (created_at, channel ID) of open tickets; entries of closed tickets are dropped lazily
+        self.oldest_heap = []
+        # channel ID -> (created_at, owner ID) of open tickets no staff member has answered yet
+        self.awaiting = {}
+        self.opened = 0
+        self.closed = 0
+        self.deleted = 0
+        self.responses = 0
+        self.response_total = 0.0
+        self.response_max = 0.0
+        self.response_buckets = [0] * len(RESPONSE_BUCKETS)
+
+class TicketStats:
+    """Ticket queue statistics per guild, updated by the ticket events instead of scanning channels.
+
+    Open tickets per type, the oldest open ticket and the time until the first staff
+    message are kept current from ticket creation, close, delete and on_message, so
+    reading them costs the same with ten tickets or ten thousand. The first response
+    is only known for tickets opened since the bot started.
+    """
+
+    def __init__(self):
+        self._guilds = {}
+        # Read by the Flask thread
+        self._lock = threading.Lock()
+
+    def _guild(self, guild_id):
+        stats = self._guilds.get(guild_id)
+        if stats is None:
+            stats = self._guilds[guild_id] = _GuildStats()
+        return stats
+
+    # --- Events ---
+
+    def build(self, guild_id, tickets):
+        """Sets the open tickets of a guild from the ticket store (on_ready, guild join)."""
+        with self._lock:
+            stats = self._guild(guild_id)
+            stats.open = {ticket.channel_id: (ticket.created_at, ticket.ticket_type)
+                          for ticket in tickets if ticket.state == "open"}
+            stats.open_by_type = {}
+            for _, ticket_type in stats.open.values():
+                stats.open_by_type[ticket_type] = stats.open_by_type.get(ticket_type, 0) + 1
+            stats.oldest_heap = [(created_at, channel_id) for channel_id, (created_at, _) in stats.open.items()]
+            heapq.heapify(stats.oldest_heap)
+            # Tickets that were waiting before a reconnect still are
+            stats.awaiting = {channel_id: entry for channel_id, entry in stats.awaiting.items() if channel_id in stats.open}
+
+    def forget(self, guild_id):
+        """Drops a guild the bot was removed from."""
+        with self._lock:
+            self._guilds.pop(guild_id, None)
+
+    def ticket_opened(self, ticket):
+        with self._lock:
+            stats = self._guild(ticket.guild_id)
+            if ticket.channel_id in stats.open:
+                return
+            stats.open[ticket.channel_id] = (ticket.created_at, ticket.ticket_type)
+            stats.open_by_type[ticket.ticket_type] = stats.open_by_type.get(ticket.ticket_type, 0) + 1
+            heapq.heappush(stats.oldest_heap, (ticket.created_at, ticket.channel_id))
+            stats.awaiting[ticket.channel_id] = (ticket.created_at, ticket.owner_id)
+            stats.opened += 1
+
+    def _remove_open(self, stats, channel_id):
+        entry = stats.open.pop(channel_id, None)
+        stats.awaiting.pop(channel_id, None)
+        if entry is None:
+            return False
+        ticket_type = entry[1]
+        stats.open_by_type[ticket_type] -= 1
+        if not stats.open_by_type[ticket_type]:
+            del stats.open_by_type[ticket_type]
+        # Closed tickets behind a long-open one are never popped - compact before they pile up
+        if len(stats.oldest_heap) > 2 * len(stats.open) + 64:
+            stats.oldest_heap = [(created_at, channel_id) for channel_id, (created_at, _) in stats.open.items()]
+            heapq.heapify(stats.oldest_heap)
+        return True
+
+    def ticket_closed(self, ticket):
+        with self._lock:
+            stats = self._guild(ticket.guild_id)
+            if self._remove_open(stats, ticket.channel_id):
+                stats.closed += 1
+
+    def ticket_deleted(self, ticket):
+        with self._lock:
+            stats = self._guild(ticket.guild_id)
+            self._remove_open(stats, ticket.channel_id)
+            stats.deleted += 1
+
+    def is_awaiting_response(self, guild_id, channel_id):
+        """Cheap pre-check for on_message: is this an open ticket without a staff answer yet?"""
+        stats = self._guilds.get(guild_id)
+        return stats is not None and channel_id in stats.awaiting
+
+    def staff_responded(self, guild_id, channel_id, author_id, now=None):
+        """Records the first staff message in a ticket (messages by the ticket owner do not count)."""
+        now = time.time() if now is None else now
+        with self._lock:
+            stats = self._guilds.get(guild_id)
+            entry = stats.awaiting.get(channel_id) if stats is not None else None
+            if entry is None or entry[1] == author_id:
+                return
+            del stats.awaiting[channel_id]
+            seconds = max(now - entry[0], 0.0)
+            stats.responses += 1
+            stats.response_total += seconds
+            stats.response_max = max(stats.response_max, seconds)
+            for i, bound in enumerate(RESPONSE_BUCKETS):
+                if seconds <= bound:
+                    stats.response_buckets[i] += 1
+                    break
+
+    # --- Reading ---
+
+    def _oldest(self, stats):
+        heap = stats.oldest_heap
+        while heap and heap[0][1] not in stats.open:
+            heapq.heappop(heap)
+        return heap[0] if heap else None
+
+    def _approximate_median(self, stats):
+        """Upper bound of the bucket holding the median first response time."""
+        if not stats.responses:
+            return None
+        seen = 0
+        for bound, count in zip(RESPONSE_BUCKETS, stats.response_buckets):
+            seen += count
+            if seen * 2 >= stats.responses:
+                return bound if bound != float("inf") else round(stats.response_max, 1)
+        return round(stats.response_max, 1)
+
+    def summary(self, guild_id, now=None):
+        """Returns the statistics of one guild as a JSON-serializable dict."""
+        now = time.time() if now is None else now
+        with self._lock:
+            stats = self._guilds.get(guild_id) or _GuildStats()
+            oldest = self._oldest(stats)
+            return {
+                "open": len(stats.open),
+                "open_by_type": dict(stats.open_by_type),
+                "oldest_open": {"channel_id": oldest[1], "age_seconds": round(now - oldest[0], 1)} if oldest else None,
+                "awaiting_first_response": len(stats.awaiting),
+                "first_response": {
+                    "count": stats.responses,
+                    "average_seconds": round(stats.response_total / stats.responses, 1) if stats.responses else None,
+                    "median_seconds_at_most": self._approximate_median(stats),
+                    "max_seconds": round(stats.response_max, 1) if stats.responses else None,
+                },
+                "since_start": {"opened": stats.opened, "closed": stats.closed, "deleted": stats.deleted},
+            }
+
+    def summaries(self):
+        """Returns {guild ID: summary} for every guild."""
+        with self._lock:
+            guild_ids = list(self._guilds)
+        return {str(guild_id): self.summary(guild_id) for guild_id in guild_ids}
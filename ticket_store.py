@@ -0,0 +1,184 @@
+import asyncio
+import logging
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Optional
+
+log = logging.getLogger("bot.store")
+
+# Writes are collected for this many seconds and then committed in one transaction
+FLUSH_DELAY = 0.5
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tickets (
+    channel_id  INTEGER PRIMARY KEY,
+    guild_id    INTEGER NOT NULL,
+    owner_id    INTEGER NOT NULL,
+    ticket_type TEXT    NOT NULL,
+    state       TEXT    NOT NULL,
+    created_at  REAL    NOT NULL,
+    closed_at   REAL,
+    deleted_at  REAL
+);
+CREATE INDEX IF NOT EXISTS tickets_by_owner ON tickets (guild_id, owner_id, state);
+"""
+
+@dataclass
+class Ticket:
+    channel_id: int
+    guild_id: int
+    owner_id: int
+    ticket_type: str
+    state: str  # "open", "closed" or "deleted"
+    created_at: float
+    closed_at: Optional[float] = None
+    deleted_at: Optional[float] = None
+
+    def as_row(self):
+        return (self.channel_id, self.guild_id, self.owner_id, self.ticket_type,
+                self.state, self.created_at, self.closed_at, self.deleted_at)
+
+class TicketStore:
+    """SQLite-backed record of every ticket: owner, type, channel, state and timestamps.
+
+    All tickets that are not deleted are loaded into memory at startup, so lookups by
+    channel or owner are dict lookups on the event loop. Changes update the memory copy
+    right away and are written to SQLite in batches from a single background thread.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ticket-store")
+        self._connection = None
+        # channel ID -> Ticket (open and closed tickets only)
+        self._by_channel = {}
+        # (guild ID, owner ID) -> {channel ID: Ticket} of the owner's open and closed tickets, oldest first
+        # (usually one - more when duplicates were recovered from channel topics)
+        self._by_owner = {}
+        # guild ID -> {channel ID: Ticket} of the guild's open and closed tickets
+        self._by_guild = {}
+        # channel ID -> row waiting to be written
+        self._pending = {}
+        self._flush_task = None
+
+    # --- Database thread ---
+
+    def _connect(self):
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.executescript(SCHEMA)
+        return self._connection
+
+    def _load_rows(self):
+        return self._connect().execute(
+            "SELECT channel_id, guild_id, owner_id, ticket_type, state, created_at, closed_at, deleted_at "
+            "FROM tickets WHERE state != 'deleted'"
+        ).fetchall()
+
+    def _write_rows(self, rows):
+        connection = self._connect()
+        with connection:
+            connection.executemany("INSERT OR REPLACE INTO tickets VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    # --- Loading and flushing ---
+
+    async def load(self):
+        """Loads all open and closed tickets from the database into memory."""
+        loop = asyncio.get_running_loop()
+        rows = await loop.run_in_executor(self._executor, self._load_rows)
+        for row in rows:
+            self._remember(Ticket(*row))
+        log.info("Loaded %d tickets from %s", len(rows), self.path)
+
+    def _queue_write(self, ticket):
+        self._pending[ticket.channel_id] = ticket.as_row()
+        if self._flush_task is None:
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(FLUSH_DELAY)
+        self._flush_task = None
+        rows, self._pending = list(self._pending.values()), {}
+        try:
+            await asyncio.get_running_loop().run_in_executor(self._executor, self._write_rows, rows)
+        except sqlite3.Error as e:
+            log.exception("Could not write %d tickets to %s: %s", len(rows), self.path, e)
+
+    def flush(self):
+        """Writes all pending changes right away (used before the process restarts)."""
+        rows, self._pending = list(self._pending.values()), {}
+        if rows:
+            self._executor.submit(self._write_rows, rows).result()
+
+    # --- In-memory index ---
+
+    def _remember(self, ticket):
+        previous = self._by_channel.get(ticket.channel_id)
+        if previous is not None:
+            self._forget(previous)
+        self._by_channel[ticket.channel_id] = ticket
+        self._by_owner.setdefault((ticket.guild_id, ticket.owner_id), {})[ticket.channel_id] = ticket
+        self._by_guild.setdefault(ticket.guild_id, {})[ticket.channel_id] = ticket
+
+    def _forget(self, ticket):
+        self._by_channel.pop(ticket.channel_id, None)
+        for index, key in ((self._by_owner, (ticket.guild_id, ticket.owner_id)), (self._by_guild, ticket.guild_id)):
+            tickets = index.get(key)
+            if tickets is not None and tickets.get(ticket.channel_id) is ticket:
+                del tickets[ticket.channel_id]
+                if not tickets:
+                    del index[key]
+
+    # --- Lookups (memory only, safe on the event loop) ---
+
+    def get(self, channel_id):
+        """Returns the open or closed ticket of a channel, or None."""
+        return self._by_channel.get(channel_id)
+
+    def get_for_owner(self, guild_id, owner_id):
+        """Returns the user's newest open or closed ticket in a guild, or None."""
+        tickets = self._by_owner.get((guild_id, owner_id))
+        return next(reversed(tickets.values())) if tickets else None
+
+    def tickets_in_guild(self, guild_id):
+        """Returns all open and closed tickets of a guild."""
+        return list(self._by_guild.get(guild_id, {}).values())
+
+    def count_in_guild(self, guild_id):
+        """Number of open and closed tickets of a guild."""
+        return len(self._by_guild.get(guild_id, ()))
+
+    def open_tickets(self):
+        """Returns the open tickets of all guilds."""
+        return [ticket for ticket in self._by_channel.values() if ticket.state == "open"]
+
+    # --- Changes (memory right away, database in the next batch) ---
+
+    def open_ticket(self, guild_id, channel_id, owner_id, ticket_type, created_at=None):
+        """Records a new open ticket."""
+        ticket = Ticket(channel_id, guild_id, owner_id, ticket_type, "open", created_at or time.time())
+        self._remember(ticket)
+        self._queue_write(ticket)
+        return ticket
+
+    def close_ticket(self, channel_id):
+        """Marks a ticket as closed."""
+        ticket = self._by_channel.get(channel_id)
+        if ticket is not None and ticket.state == "open":
+            ticket.state = "closed"
+            ticket.closed_at = time.time()
+            self._queue_write(ticket)
+        return ticket
+
+    def delete_ticket(self, channel_id):
+        """Marks a ticket as deleted (its channel is gone) and drops it from memory."""
+        ticket = self._by_channel.get(channel_id)
+        if ticket is not None:
+            ticket.state = "deleted"
+            ticket.deleted_at = time.time()
+            self._forget(ticket)
+            self._queue_write(ticket)
+        return ticket
@@ -0,0 +1,106 @@
+import json
+import logging
+
+import discord
+
+log = logging.getLogger("bot.ticket_types")
+
+# Keys every ticket type in the registry file must have
+REQUIRED_KEYS = ("custom_id", "label", "channel_type", "support_roles", "title", "description")
+# Placeholders the texts filled in per ticket may use
+PLACEHOLDERS = {"description": "user", "created_message": "channel"}
+# Keys whose value has to be a string (if present)
+STRING_KEYS = ("custom_id", "label", "style", "emoji", "summary", "channel_type", "created_message",
+               "title", "description", "color", "category")
+
+def parse_color(value):
+    """Turns a color name ("blue") or hex string ("#3498db") into a discord.Color."""
+    if value.startswith("#"):
+        return discord.Color(int(value[1:], 16))
+    # Only the named color factories, not other attributes such as from_rgb or value
+    factory = getattr(discord.Color, value, None) if not value.startswith("_") else None
+    try:
+        color = factory() if callable(factory) else None
+    except TypeError:
+        color = None
+    if not isinstance(color, discord.Color):
+        raise ValueError(f"unknown color {value!r}")
+    return color
+
+class TicketType:
+    """One kind of ticket (one button on the ticket panel), as configured in the registry file.
+
+    Everything that is the same for every ticket of this type - the button, the welcome
+    embed and the support roles - is built once here, so a click only fills in the user.
+    """
+
+    def __init__(self, key, config):
+        if not isinstance(config, dict):
+            raise ValueError(f"ticket type {key!r} must be an object")
+        missing = [name for name in REQUIRED_KEYS if name not in config]
+        if missing:
+            raise ValueError(f"ticket type {key!r} is missing {', '.join(missing)}")
+        wrong = [name for name in STRING_KEYS if name in config and not isinstance(config[name], str)]
+        if wrong:
+            raise ValueError(f"ticket type {key!r} needs a string as {', '.join(wrong)}")
+
+        self.key = key
+        self.custom_id = config["custom_id"]
+        self.label = config["label"]
+        self.style = getattr(discord.ButtonStyle, config.get("style", "blurple"), None)
+        if not isinstance(self.style, discord.ButtonStyle):
+            raise ValueError(f"ticket type {key!r} has an unknown button style")
+        self.emoji = config.get("emoji")
+        self.summary = config.get("summary", "")
+        # Used in the channel name and topic ("ticket-<channel_type>-<user>")
+        self.channel_type = config["channel_type"]
+        support_roles = config["support_roles"]
+        if isinstance(support_roles, str):
+            support_roles = [support_roles]
+        if not isinstance(support_roles, list) or not all(isinstance(name, str) for name in support_roles):
+            raise ValueError(f"ticket type {key!r} needs a role name or a list of role names as support_roles")
+        self.support_roles = support_roles
+        self.created_message = config.get("created_message", "Ticket erstellt: {channel}")
+        self.description = config["description"]
+        # Fill in every text once, so a typo fails here and not on every click of the button
+        for name, placeholder in PLACEHOLDERS.items():
+            try:
+                getattr(self, name).format(**{placeholder: ""})
+            except (KeyError, IndexError, AttributeError, ValueError) as e:
+                raise ValueError(f"ticket type {key!r} has an invalid placeholder in {name} "
+                                 f"(only {{{placeholder}}} is allowed): {e!r}") from None
+
+        try:
+            color = parse_color(config.get("color", "blue"))
+        except ValueError as e:
+            raise ValueError(f"ticket type {key!r} has an invalid color: {e}") from None
+        embed = discord.Embed(title=config["title"], color=color)
+        embed.add_field(name="Kategorie", value=config.get("category", self.label), inline=True)
+        self.embed_template = embed.to_dict()
+
+    def build_welcome_embed(self, user):
+        """Returns the welcome embed of a new ticket, filled in for the user."""
+        creator_field = {"name": "Ticket erstellt von", "value": user.display_name, "inline": True}
+        return discord.Embed.from_dict(dict(
+            self.embed_template,
+            description=self.description.format(user=user.mention),
+            fields=[creator_field, *self.embed_template["fields"]],
+        ))
+
+def load_ticket_types(path):
+    """Reads the ticket type registry (JSON, or YAML if PyYAML is installed) in file order."""
+    with open(path, encoding="utf-8") as f:
+        if path.endswith((".yaml", ".yml")):
+            import yaml  # Optional, only needed for YAML registries
+            data = yaml.safe_load(f)
+        else:
+            data = json.load(f)
+
+    if not isinstance(data, dict):
+        raise ValueError(f"{path} must be an object of ticket types")
+    ticket_types = {key: TicketType(key, config) for key, config in data.items()}
+    custom_ids = [ticket_type.custom_id for ticket_type in ticket_types.values()]
+    if len(set(custom_ids)) != len(custom_ids):
+        raise ValueError(f"duplicate custom_id in {path}")
+    log.info("Loaded %d ticket types from %s", len(ticket_types), path)
+    return ticket_types
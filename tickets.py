@@ -0,0 +1,354 @@
+import asyncio
+
+import discord
+
+from admission_queue import QueueFull
+from transcripts import start_transcript_export
+from bot import (
+    IDLE_TICKET_GRACE_HOURS, IDLE_TICKET_HOURS, TICKET_CREATE_SECONDS, TICKET_QUEUE_REJECTED, TICKET_TYPES,
+    TICKETS_AUTO_CLOSED, TICKETS_CLOSED, TICKETS_DELETED,
+    category_pool, claim_ticket_creation, deletion_scheduler, get_ticket_template, guild_configs, handler_profiler, has_any_existing_ticket,
+    is_ticket_staff, permission_log, release_ticket_creation, ticket_log, ticket_queue, ticket_stats, ticket_store,
+)
+
+# Ticket channel creation and the ticket buttons. Reloaded in place by !reload, so this module
+# must not hold state of its own - caches and indexes live in bot.py.
+
+async def create_ticket_channel(guild, user, ticket_type, support_role_names, config=None):
+    """Creates a private ticket channel for the user."""
+    
+    # Set channel permissions
+    overwrites = {
+        guild.default_role: discord.PermissionOverwrite(read_messages=False),  # Hide from everyone
+        user: discord.PermissionOverwrite(read_messages=True, send_messages=True),  # User can read/write
+        guild.me: discord.PermissionOverwrite(read_messages=True, send_messages=True)  # Bot can read/write
+    }
+    
+    # Add admin and support roles from the prebuilt template of this ticket type
+    role_overwrites, _ = get_ticket_template(guild, support_role_names, config)
+    overwrites.update(role_overwrites)
+    
+    # First ticket category with room left (a new one is created when all are full)
+    category = await category_pool.get_category(guild)
+    
+    # Create the channel WITHOUT user ID in name
+    channel_name = f"ticket-{ticket_type}-{user.name}".lower().replace(" ", "-")
+    channel = await guild.create_text_channel(
+        name=channel_name,
+        overwrites=overwrites,
+        category=category,
+        topic=f"Support Ticket für {user.display_name} (ID: {user.id}) - {ticket_type}"
+    )
+    
+    # Record right away so a second click already sees the open ticket
+    ticket = ticket_store.open_ticket(guild.id, channel.id, user.id, ticket_type)
+    ticket_stats.ticket_opened(ticket)
+    category_pool.channel_created(channel)
+
+    ticket_log.info("Created ticket channel: %s for user %s (ID: %s)", channel.name, user.name, user.id)
+    return channel
+
+def closed_overwrites(channel):
+    """Overwrites of a closed ticket: only the bot can still write, @everyone stays hidden."""
+    overwrites = channel.overwrites.copy()
+    
+    for user_or_role, perms in overwrites.items():
+        if user_or_role == channel.guild.me:
+            # Keep bot permissions
+            continue
+        elif user_or_role == channel.guild.default_role:
+            # Keep @everyone hidden
+            continue
+        else:
+            # Remove send_messages for all users and roles
+            new_perms = discord.PermissionOverwrite(
+                read_messages=perms.read_messages,
+                send_messages=False,
+                manage_messages=perms.manage_messages if hasattr(perms, 'manage_messages') else None
+            )
+            overwrites[user_or_role] = new_perms
+    return overwrites
+
+async def close_idle_ticket(channel):
+    """Closes a ticket without activity like the close button does and deletes it after the grace period."""
+    embed = discord.Embed(
+        title="🔒 Ticket automatisch geschlossen",
+        description=f"In diesem Ticket gab es seit {IDLE_TICKET_HOURS:g} Stunden keine Aktivität.\n\n"
+                    f"Es wird in {IDLE_TICKET_GRACE_HOURS:g} Stunden automatisch gelöscht oder kann vorher mit dem 🗑️ Button gelöscht werden.",
+        color=discord.Color.orange()
+    )
+    await channel.send(embed=embed, view=TicketDeleteOnlyView())
+    await channel.edit(overwrites=closed_overwrites(channel), reason="Ticket ohne Aktivität")
+    ticket = ticket_store.close_ticket(channel.id)
+    if ticket is not None:
+        ticket_stats.ticket_closed(ticket)
+    TICKETS_AUTO_CLOSED.inc()
+    
+    # Save the transcript now - nobody but staff can see the channel anymore and the deletion waits for it
+    deletion_scheduler.hold_channel_delete(channel, start_transcript_export(channel))
+    deletion_scheduler.schedule_channel_delete(channel, IDLE_TICKET_GRACE_HOURS * 3600, reason="Ticket ohne Aktivität")
+    ticket_log.info("Auto-closed idle ticket channel: %s", channel.name)
+
+class ProfiledView(discord.ui.View):
+    """Persistent view whose button callbacks are measured by the handler profiler (keyed by custom_id)."""
+
+    def __init__(self, *, timeout=None):
+        super().__init__(timeout=timeout)
+        for item in self.children:
+            self._profile(item)
+
+    def add_item(self, item):
+        self._profile(item)
+        return super().add_item(item)
+
+    @staticmethod
+    def _profile(item):
+        item.callback = handler_profiler.wrap(item.custom_id, item.callback)
+
+class TicketClosedView(ProfiledView):
+    """View for closed tickets by normal users (no delete button)."""
+    
+    def __init__(self):
+        super().__init__(timeout=None)
+    
+    # No buttons - normal users can't do anything with closed tickets
+
+class TicketDeleteOnlyView(ProfiledView):
+    """View with only delete button for closed tickets."""
+    
+    def __init__(self):
+        super().__init__(timeout=None)
+    
+    @discord.ui.button(label="🗑️ Ticket löschen", style=discord.ButtonStyle.red, custom_id="delete_closed_ticket")
+    async def delete_ticket(self, interaction: discord.Interaction, button: discord.ui.Button):
+        try:
+            # Admins (OWNER, Admin) and every support role that gets pinged in tickets can ALWAYS delete
+            allowed = is_ticket_staff(interaction.user)
+            
+            permission_log.debug("User %s trying to delete ticket. Staff: %s", interaction.user.name, allowed)
+            
+            # If user has admin/support roles, they can delete regardless of being ticket creator
+            if allowed:
+                permission_log.debug("User %s has permission - deleting ticket", interaction.user.name)
+                await interaction.response.send_message("🗑️ Ticket wird in 5 Sekunden gelöscht...", ephemeral=False)
+                # Save the transcript during the countdown - the deletion waits until it is written
+                deletion_scheduler.hold_channel_delete(interaction.channel, start_transcript_export(interaction.channel))
+                deletion_scheduler.schedule_channel_delete(interaction.channel, 5, reason=f"Ticket gelöscht von {interaction.user}")
+                TICKETS_DELETED.inc()
+                return
+            
+            # ONLY check ticket creator status if user has NO admin/support roles
+            ticket = ticket_store.get(interaction.channel.id)
+            is_ticket_creator = ticket is not None and ticket.owner_id == interaction.user.id
+            if is_ticket_creator:
+                permission_log.debug("User is ticket creator according to the ticket store")
+            
+            # If user is ONLY ticket creator (no support roles), deny
+            if is_ticket_creator:
+                await interaction.response.send_message("❌ Als Ticket-Ersteller kannst du das Ticket nicht löschen! Nur Support-Rollen und Admins können Tickets löschen.", ephemeral=True)
+                return
+            
+            # No permissions at all
+            await interaction.response.send_message("❌ Du hast keine Berechtigung, Tickets zu löschen! Nur gepingte Rollen (Support-Teams und Admins) können Tickets löschen.", ephemeral=True)
+            
+        except Exception as e:
+            ticket_log.exception("Error in delete_ticket: %s", e)
+            if not interaction.response.is_done():
+                await interaction.response.send_message("❌ Fehler beim Löschen des Tickets. Versuche es erneut.", ephemeral=True)
+
+class TicketCloseView(ProfiledView):
+    """View with close and delete buttons for ticket channels."""
+    
+    def __init__(self):
+        super().__init__(timeout=None)
+    
+    @discord.ui.button(label="🔒 Ticket schließen", style=discord.ButtonStyle.secondary, custom_id="close_ticket")
+    async def close_ticket(self, interaction: discord.Interaction, button: discord.ui.Button):
+        try:
+            # Admins (OWNER, Admin) and support roles can always close
+            allowed = is_ticket_staff(interaction.user)
+            
+            # Check if user is the ticket creator (the stored owner, not the channel name or topic)
+            ticket = ticket_store.get(interaction.channel.id)
+            is_ticket_creator = ticket is not None and ticket.owner_id == interaction.user.id
+            
+            # Users added to the ticket with their own overwrite may close it as well
+            user_perms = interaction.channel.overwrites_for(interaction.user)
+            if user_perms.read_messages is True and user_perms.send_messages is True:
+                is_ticket_creator = True
+            
+            if not allowed and is_ticket_creator:
+                allowed = True
+            
+            if not allowed:
+                await interaction.response.send_message("❌ Du hast keine Berechtigung, dieses Ticket zu schließen!", ephemeral=True)
+                return
+            
+            # Close ticket - remove ALL write permissions except for bot
+            embed = discord.Embed(
+                title="🔒 Ticket geschlossen",
+                description=f"Dieses Ticket wurde von {interaction.user.mention} geschlossen.\n\nDas Ticket kann mit dem 🗑️ Button gelöscht werden.",
+                color=discord.Color.orange()
+            )
+            await interaction.response.send_message(embed=embed)
+            
+            # Remove write permissions for EVERYONE except the bot
+            await interaction.channel.edit(overwrites=closed_overwrites(interaction.channel))
+            ticket = ticket_store.close_ticket(interaction.channel.id)
+            if ticket is not None:
+                ticket_stats.ticket_closed(ticket)
+            TICKETS_CLOSED.inc()
+            
+            # Show appropriate view based on who has access to the channel, not who closed it
+            view = TicketDeleteOnlyView()  # Always show delete button for closed tickets
+            await interaction.edit_original_response(embed=embed, view=view)
+            
+        except Exception as e:
+            ticket_log.exception("Error in close_ticket: %s", e)
+            if not interaction.response.is_done():
+                await interaction.response.send_message("❌ Fehler beim Schließen des Tickets. Versuche es erneut.", ephemeral=True)
+
+    @discord.ui.button(label="🗑️ Ticket löschen", style=discord.ButtonStyle.red, custom_id="delete_ticket")
+    async def delete_ticket(self, interaction: discord.Interaction, button: discord.ui.Button):
+        try:
+            # Check if user is the ticket creator (the stored owner) - they CANNOT delete
+            ticket = ticket_store.get(interaction.channel.id)
+            is_ticket_creator = ticket is not None and ticket.owner_id == interaction.user.id
+            
+            # Users added to the ticket with their own overwrite (and no staff role) count as creators too
+            user_perms = interaction.channel.overwrites_for(interaction.user)
+            if (user_perms.read_messages is True and user_perms.send_messages is not None and 
+                not is_ticket_staff(interaction.user)):
+                is_ticket_creator = True
+            
+            # Ticket creator cannot delete
+            if is_ticket_creator:
+                await interaction.response.send_message("❌ Als Ticket-Ersteller kannst du das Ticket nicht löschen! Nur Support-Rollen und Admins können Tickets löschen.", ephemeral=True)
+                return
+            
+            # Check if user has permission to delete (admins and support roles that get pinged in tickets)
+            allowed = is_ticket_staff(interaction.user)
+            
+            if not allowed:
+                await interaction.response.send_message("❌ Du hast keine Berechtigung, Tickets zu löschen! Nur gepingte Rollen (Support-Teams und Admins) können Tickets löschen.", ephemeral=True)
+                return
+            
+            # Delete the ticket
+            await interaction.response.send_message("🗑️ Ticket wird in 5 Sekunden gelöscht...", ephemeral=False)
+            # Save the transcript during the countdown - the deletion waits until it is written
+            deletion_scheduler.hold_channel_delete(interaction.channel, start_transcript_export(interaction.channel))
+            deletion_scheduler.schedule_channel_delete(interaction.channel, 5, reason=f"Ticket gelöscht von {interaction.user}")
+            TICKETS_DELETED.inc()
+            
+        except Exception as e:
+            ticket_log.exception("Error in delete_ticket: %s", e)
+            if not interaction.response.is_done():
+                await interaction.response.send_message("❌ Fehler beim Löschen des Tickets. Versuche es erneut.", ephemeral=True)
+
+# --- Discord UI Components (Buttons) ---
+
+async def open_ticket(interaction, ticket_type):
+    """Creates a ticket of the given type for the user who clicked its button."""
+    # Only one ticket creation per user at a time - answer repeated clicks right away
+    if not claim_ticket_creation(interaction.guild, interaction.user):
+        await interaction.response.send_message("⏳ Dein Ticket wird bereits erstellt. Bitte warte einen Moment.", ephemeral=True)
+        return
+
+    try:
+        # One config for the whole creation, even if a new one is applied while it waits in the queue
+        config = guild_configs.get(interaction.guild.id)
+        support_roles = config.support_roles_for(ticket_type)
+        
+        # Check if user already has ANY ticket (not just one of this type)
+        with TICKET_CREATE_SECONDS.time(phase="duplicate_check"):
+            existing_ticket = await has_any_existing_ticket(interaction.guild, interaction.user)
+        if existing_ticket:
+            await interaction.response.send_message(
+                f"❌ Du hast bereits ein offenes Ticket: {existing_ticket.mention}\n"
+                f"Bitte schließe dein aktuelles Ticket, bevor du ein neues erstellst.", 
+                ephemeral=True
+            )
+            return
+        
+        # Queue behind the other clicks in this guild - full queue means try again later
+        try:
+            turn = ticket_queue.enqueue(interaction.guild.id)
+        except QueueFull:
+            TICKET_QUEUE_REJECTED.inc()
+            await interaction.response.send_message("🚦 Gerade werden sehr viele Tickets erstellt. Bitte versuche es in einer Minute erneut.", ephemeral=True)
+            return
+        
+        async with turn:
+            # Acknowledge right away so the interaction can't time out while waiting for the rate limit
+            await interaction.response.defer(ephemeral=True, thinking=True)
+            if turn.position:
+                try:
+                    await interaction.followup.send(f"⏳ Viele Anfragen gerade - du bist auf Platz {turn.position + 1} in der Warteschlange. Dein Ticket wird gleich erstellt.", ephemeral=True)
+                except discord.HTTPException as e:
+                    ticket_log.debug("Could not send queue position: %s", e)
+            
+            try:
+                with TICKET_CREATE_SECONDS.time(phase="queue_wait"):
+                    await turn.wait()
+            except asyncio.TimeoutError:
+                # Only the queue's max_wait - REST timeouts further down are ordinary errors
+                ticket_log.warning("Ticket creation for %s timed out in the queue", interaction.user.name)
+                await interaction.edit_original_response(content="❌ Die Warteschlange ist gerade zu lang. Bitte versuche es später erneut.")
+                return
+            
+            # Create ticket channel - the next user's turn starts as soon as it exists
+            with TICKET_CREATE_SECONDS.time(phase="channel_create"):
+                channel = await create_ticket_channel(
+                    interaction.guild, 
+                    interaction.user, 
+                    ticket_type.channel_type, 
+                    support_roles,
+                    config
+                )
+        
+        await interaction.edit_original_response(content=ticket_type.created_message.format(channel=channel.mention))
+        
+        # Send welcome message in the new channel (prebuilt per ticket type, only the user is filled in)
+        embed = ticket_type.build_welcome_embed(interaction.user)
+        
+        # Mention the user plus the admin and support roles of this ticket type
+        _, role_mentions = get_ticket_template(interaction.guild, support_roles, config)
+        mention_text = f"{interaction.user.mention} {role_mentions}".rstrip()
+        with TICKET_CREATE_SECONDS.time(phase="welcome_send"):
+            await channel.send(mention_text, embed=embed, view=TicketCloseView())
+        
+    except Exception as e:
+        ticket_log.exception("Error creating %s ticket: %s", ticket_type.key, e)
+        if not interaction.response.is_done():
+            await interaction.response.send_message("❌ Fehler beim Erstellen des Tickets. Versuche es erneut.", ephemeral=True)
+        else:
+            await interaction.edit_original_response(content="❌ Fehler beim Erstellen des Tickets. Versuche es erneut.")
+    finally:
+        release_ticket_creation(interaction.guild, interaction.user)
+
+class TicketTypeButton(discord.ui.Button):
+    """Panel button that opens a ticket of one configured type."""
+
+    def __init__(self, ticket_type):
+        super().__init__(label=ticket_type.label, style=ticket_type.style, emoji=ticket_type.emoji, custom_id=ticket_type.custom_id)
+        self.ticket_type = ticket_type
+
+    async def callback(self, interaction: discord.Interaction):
+        await open_ticket(interaction, self.ticket_type)
+
+# Define a View for the buttons (one per ticket type in the registry)
+class TicketSystemView(ProfiledView):
+    def __init__(self):
+        super().__init__(timeout=None) # Keep the view persistent
+        for ticket_type in TICKET_TYPES.values():
+            self.add_item(TicketTypeButton(ticket_type))
+
+def build_ticket_panel_embed():
+    """Builds the ticket panel embed listing every configured ticket type."""
+    lines = [f"{ticket_type.emoji or ''} **{ticket_type.label}**".lstrip() + f"\n{ticket_type.summary}"
+             for ticket_type in TICKET_TYPES.values()]
+    return discord.Embed(
+        title="Server_Name TICKETSYSTEM ✉️",
+        description="Wähle die passende Kategorie für dein Anliegen:\n\n" + "\n\n".join(lines) + "\n\nKlicke auf einen Button, um zu starten.",
+        color=discord.Color.blue() # You can choose any color
+    )
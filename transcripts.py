@@ -0,0 +1,89 @@
+import asyncio
+import gzip
+import json
+import logging
+import os
+import re
+
+import discord
+
+log = logging.getLogger("bot.transcripts")
+
+# Ticket transcripts are written here as gzip-compressed JSON lines (one message per line)
+TRANSCRIPTS_ENABLED = os.getenv('TRANSCRIPTS', '1').lower() not in ('0', 'false', 'no')
+TRANSCRIPT_DIR = os.getenv('TRANSCRIPT_DIR', 'transcripts')
+
+# Give up on an export after this many seconds so the ticket still gets deleted
+TRANSCRIPT_TIMEOUT = float(os.getenv('TRANSCRIPT_TIMEOUT', '300'))
+
+# Messages buffered before they are handed to the writer thread (one history page)
+TRANSCRIPT_PAGE_SIZE = 100
+
+def serialize_message(message):
+    """Turns a message into a JSON-serializable dict for the transcript."""
+    return {
+        "id": message.id,
+        "created_at": message.created_at.isoformat(),
+        "edited_at": message.edited_at.isoformat() if message.edited_at else None,
+        "author_id": message.author.id,
+        "author": str(message.author),
+        "bot": message.author.bot,
+        "content": message.content,
+        "attachments": [attachment.url for attachment in message.attachments],
+        "embeds": [embed.to_dict() for embed in message.embeds],
+    }
+
+def _open_transcript(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return gzip.open(path, "wt", encoding="utf-8")
+
+def _write_lines(f, entries):
+    f.writelines(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries)
+
+async def export_transcript(channel):
+    """Streams the whole history of a channel into a compressed JSONL file.
+
+    History is read page by page (oldest first) and each page is written from a worker
+    thread, so memory stays at one page and the event loop never waits on disk or gzip.
+    Returns the path of the transcript.
+    """
+    safe_name = re.sub(r"[^\w-]", "_", channel.name)
+    timestamp = discord.utils.utcnow().strftime("%Y%m%d-%H%M%S")
+    path = os.path.join(TRANSCRIPT_DIR, str(channel.guild.id), f"{safe_name}-{channel.id}-{timestamp}.jsonl.gz")
+
+    f = await asyncio.to_thread(_open_transcript, path)
+    count = 0
+    try:
+        header = {
+            "channel_id": channel.id,
+            "channel": channel.name,
+            "topic": channel.topic,
+            "guild_id": channel.guild.id,
+            "exported_at": discord.utils.utcnow().isoformat(),
+        }
+        page = [header]
+        async for message in channel.history(limit=None, oldest_first=True):
+            page.append(serialize_message(message))
+            count += 1
+            if len(page) >= TRANSCRIPT_PAGE_SIZE:
+                await asyncio.to_thread(_write_lines, f, page)
+                page = []
+        await asyncio.to_thread(_write_lines, f, page)
+    finally:
+        await asyncio.to_thread(f.close)
+
+    log.info("Transcript of #%s saved to %s (%d messages)", channel.name, path, count)
+    return path
+
+async def _export_with_timeout(channel):
+    try:
+        return await asyncio.wait_for(export_transcript(channel), timeout=TRANSCRIPT_TIMEOUT)
+    except Exception as e:
+        log.exception("Transcript of #%s failed: %s", channel.name, e)
+        return None
+
+def start_transcript_export(channel):
+    """Starts exporting the transcript in the background and returns the task (None if disabled)."""
+    if not TRANSCRIPTS_ENABLED:
+        return None
+    return asyncio.create_task(_export_with_timeout(channel))